@@ -6,9 +6,31 @@ import matplotlib.pyplot as plt
 # input file for analysis:
 csv_filename = 'experiment-1000-custom_5_20'
 
+# input parquet dataset for analysis (used instead of the csv file if set, needs pyarrow):
+parquet_dataset = None              # e.g. 'results-custom_5_20'
+parquet_experiment_id = 1000
+parquet_planners = None             # list of planners to load / None for all
+
 
 # ----- Data preparation -----
-data = pd.read_csv('reports/%s.csv' % csv_filename)
+if parquet_dataset is None:
+    data = pd.read_csv('reports/%s.csv' % csv_filename)
+    report_name = csv_filename
+else:
+    import pyarrow.parquet as pq
+
+    # load only the partitions & columns needed for the analysis
+    dataset_path = 'reports/%s.parquet' % parquet_dataset
+    filters = [('experiment_id', '=', parquet_experiment_id)]
+    if parquet_planners is not None:
+        filters.append(('planner', 'in', parquet_planners))
+    dataset = pq.ParquetDataset(dataset_path, filters=filters)
+    columns = ['planner', 'behavior_status', 'time_spent', 'robustness'] + \
+        [col for col in dataset.schema.names if col.split('_')[0] == 'ag']
+    data = dataset.read(columns=columns).to_pandas()
+    data['planner'] = data['planner'].astype(str)
+    report_name = '%s-%s' % (parquet_dataset, parquet_experiment_id)
+
 planners = sorted(list(data['planner'].unique()))
 agent_ids = sorted(list(set([int(col.split('_')[1]) for col in data.columns if col.split('_')[0] == 'ag'])))
 
@@ -66,4 +88,4 @@ axes[2].set_xlabel('')
 axes[2].legend(loc=5)
 
 plt.show()
-fig.savefig('reports/%s.png' % csv_filename)
+fig.savefig('reports/%s.png' % report_name)
@@ -0,0 +1,627 @@
+import fuzzy_logic as fl
+from model import Task, Agent
+from planners import Planner
+
+from random import randint
+from scipy.sparse import csr_matrix
+import numpy as np
+
+# Struct-of-arrays alternative to the object model of model.py
+# the state of tasks, actions and agents is kept in integer-coded numpy arrays (indexed by position),
+# so that all agents can be progressed in vectorized steps
+# ArrayBehavior / ArrayTeam can be used in place of Behavior / Team by the simulation,
+# while Planner (and Logger) get the interface of the object model through thin views over the arrays
+
+# ----- status codes -----
+TASK_STATUSES = ['available', 'inprogress', 'completed']
+ACTION_STATUSES = [None, 'inqueue', 'inwaiting', 'inprogress', 'completed']
+AGENT_STATUSES = ['rest', 'wait', 'work']     # same codes as Reporter.statuses_codes
+
+TASK_AVAILABLE, TASK_INPROGRESS, TASK_COMPLETED = range(3)
+ACTION_NONE, ACTION_INQUEUE, ACTION_INWAITING, ACTION_INPROGRESS, ACTION_COMPLETED = range(5)
+AGENT_REST, AGENT_WAIT, AGENT_WORK = range(3)
+
+
+class ArrayBehavior:
+
+    id = None
+    name = None
+    tasks = []              # TaskView for every task
+    tasks_index = None      # {task_id: TaskView}
+    actions = []            # ActionView for every action (actions of each task stored contiguously)
+
+    status = None           # available / inprogress / completed / failed
+
+    # ----- tasks' state (arrays indexed by task position) -----
+    tasks_ids = None
+    tasks_status = None             # task status codes
+    tasks_owner = None              # position of agent assigned to task / -1
+    tasks_first_action = None       # position of first action of task
+    tasks_num_of_actions = None
+    tasks_actions_left = None       # num of actions of task not completed yet
+
+    # ----- actions' state (arrays indexed by action position) -----
+    actions_ids = None
+    actions_task = None             # position of task of action
+    actions_status = None           # action status codes
+    actions_owner = None            # position of agent assigned to action / -1
+    actions_time_left = None        # time needed for action in progress to be completed / nan
+    actions_constraints = None      # list of positions of constraining actions, for every action
+    actions_constraints_left = None     # num of constraints of action not met yet
+    dependents = None               # sparse matrix (constraining x constrained actions) of constraints' counts
+
+    team = None             # ArrayTeam working on behavior (for views of agents assigned)
+
+    logger = None
+
+    def __init__(self, behavior_specs, actions_names, logger):
+
+        tasks_ids = []
+        tasks_first_action = []
+        tasks_num_of_actions = []
+        tasks_positions = {}
+        actions_ids = []
+        actions_task = []
+        for task_position, task_specs in enumerate(behavior_specs['tasks_specs']):
+            tasks_ids.append(task_specs['id'])
+            tasks_first_action.append(len(actions_ids))
+            tasks_num_of_actions.append(len(task_specs['action_list']))
+            tasks_positions.setdefault(task_specs['id'], task_position)
+            for action_id in task_specs['action_list']:
+                actions_ids.append(action_id)
+                actions_task.append(task_position)
+
+        # constraints given as 'task_id-action_id' strings - stored as positions of constraining actions
+        actions_constraints = []
+        for task_specs in behavior_specs['tasks_specs']:
+            for action_id in task_specs['action_list']:
+                action_constraints = []
+                for constraint in task_specs['constraints'].get(action_id, []):
+                    constraining_task_id, constraining_action_id = map(int, constraint.split('-'))
+                    constraining_task = tasks_positions[constraining_task_id]
+                    constraining_task_actions = behavior_specs['tasks_specs'][constraining_task]['action_list']
+                    action_constraints.append(tasks_first_action[constraining_task]
+                                              + constraining_task_actions.index(constraining_action_id))
+                actions_constraints.append(action_constraints)
+
+        num_of_actions = len(actions_ids)
+        constraining = [constraint for action_constraints in actions_constraints for constraint in action_constraints]
+        constrained = [action for action, action_constraints in enumerate(actions_constraints)
+                       for _ in action_constraints]
+
+        self.id = behavior_specs['id']
+        self.name = behavior_specs['name']
+        self.tasks_ids = np.array(tasks_ids, dtype=np.int64)
+        self.tasks_first_action = np.array(tasks_first_action, dtype=np.int64)
+        self.tasks_num_of_actions = np.array(tasks_num_of_actions, dtype=np.int64)
+        self.actions_ids = np.array(actions_ids, dtype=np.int64)
+        self.actions_task = np.array(actions_task, dtype=np.int64)
+        self.actions_constraints = actions_constraints
+        self.dependents = csr_matrix((np.ones(len(constraining), dtype=np.int64), (constraining, constrained)),
+                                     shape=(num_of_actions, num_of_actions))
+
+        # views
+        self.actions = [ActionView(self, position, actions_names[action_id])
+                        for position, action_id in enumerate(actions_ids)]
+        self.tasks = [TaskView(self, position, task_specs['name'])
+                      for position, task_specs in enumerate(behavior_specs['tasks_specs'])]
+        self.tasks_index = {}
+        for task in self.tasks:
+            self.tasks_index.setdefault(task.id, task)
+
+        self.reset(logger)
+
+    def reset(self, logger):
+        """
+        restore behavior, tasks & actions to their initial state (as built), for a new trial
+        """
+        num_of_tasks = len(self.tasks_ids)
+        num_of_actions = len(self.actions_ids)
+
+        self.status = 'available'
+        self.tasks_status = np.full(num_of_tasks, TASK_AVAILABLE, dtype=np.int8)
+        self.tasks_owner = np.full(num_of_tasks, -1, dtype=np.int64)
+        self.tasks_actions_left = self.tasks_num_of_actions.copy()
+        self.actions_status = np.full(num_of_actions, ACTION_NONE, dtype=np.int8)
+        self.actions_owner = np.full(num_of_actions, -1, dtype=np.int64)
+        self.actions_time_left = np.full(num_of_actions, np.nan)
+        self.actions_constraints_left = np.array([len(action_constraints)
+                                                  for action_constraints in self.actions_constraints], dtype=np.int64)
+        self.team = None
+        self.logger = logger
+
+    def update(self, actions_completed):
+        """
+        actions_completed :: list of positions of actions completed since last update
+        releases the actions constrained by them and checks if their tasks / behavior have been completed
+        (one action at a time, so that events are logged in the same order as by the object model)
+        """
+        tasks_changed = False
+        for action in actions_completed:
+
+            # remove met constraints of actions constrained by action completed
+            first, last = self.dependents.indptr[action], self.dependents.indptr[action + 1]
+            dependents = self.dependents.indices[first:last]
+            self.actions_constraints_left[dependents] -= self.dependents.data[first:last]
+            for dependent in dependents[self.actions_constraints_left[dependents] == 0].tolist():
+                self.logger.action_available(int(self.tasks_ids[self.actions_task[dependent]]),
+                                             int(self.actions_ids[dependent]))
+
+            # check if task completed
+            task = self.actions_task[action]
+            self.tasks_actions_left[task] -= 1
+            if self.tasks_actions_left[task] == 0 and self.tasks_status[task] != TASK_COMPLETED:
+                self.tasks_status[task] = TASK_COMPLETED
+                self.logger.task_completed(int(self.tasks_ids[task]))
+                tasks_changed = True
+
+        # check if behavior completed
+        if tasks_changed and (self.tasks_status == TASK_COMPLETED).all():
+            self.status = 'completed'
+            self.logger.behavior_completed(self.id)
+
+    def __getitem__(self, key):
+        return self.get_task_by_id(key)
+
+    def get_task_by_id(self, task_id):
+        """
+        Get task by id
+        Returns TaskView / None
+        """
+        return self.tasks_index.get(task_id)
+
+    def get_tasks_ids(self, status_filter=None):
+        """
+        Get tasks by status
+        Returns list of tasks' ids
+        """
+        if status_filter is None:
+            return self.tasks_ids.tolist()
+        elif status_filter in TASK_STATUSES:
+            return self.tasks_ids[self.tasks_status == TASK_STATUSES.index(status_filter)].tolist()
+        else:
+            return []
+
+    def get_tasks_constraints_num(self, status_filter=None):
+        """
+        Get num of constraints not met yet of the actions of tasks by status (for all tasks at once)
+        Returns {task_id: constraints_num}
+        """
+        # actions of each task are stored contiguously (every task has at least one action)
+        constraints_num = np.add.reduceat(self.actions_constraints_left, self.tasks_first_action)
+        if status_filter is None:
+            tasks = slice(None)
+        elif status_filter in TASK_STATUSES:
+            tasks = self.tasks_status == TASK_STATUSES.index(status_filter)
+        else:
+            return {}
+        return dict(zip(self.tasks_ids[tasks].tolist(), constraints_num[tasks].tolist()))
+
+    def get_tasks_constrained(self, status_filter=None):
+        """
+        Get if any action of tasks by status has constraints not met yet (for all tasks at once)
+        Returns {task_id: bool}
+        """
+        return {task_id: constraints_num > 0
+                for task_id, constraints_num in self.get_tasks_constraints_num(status_filter).items()}
+
+
+class TaskView:
+    """
+    view of a task of ArrayBehavior, with the interface of model.Task
+    """
+
+    __slots__ = ('behavior', 'position', 'id', 'name', 'actions', 'actions_index', 'actions_positions')
+
+    def __init__(self, behavior, position, task_name):
+        self.behavior = behavior
+        self.position = position
+        self.id = int(behavior.tasks_ids[position])
+        self.name = task_name
+        first_action = int(behavior.tasks_first_action[position])
+        self.actions = behavior.actions[first_action:first_action + int(behavior.tasks_num_of_actions[position])]
+        self.actions_index = {}
+        self.actions_positions = {}
+        for action_position, action in enumerate(self.actions):
+            self.actions_index.setdefault(action.id, action)
+            self.actions_positions.setdefault(action.id, action_position)
+
+    @property
+    def status(self):
+        return TASK_STATUSES[self.behavior.tasks_status.item(self.position)]
+
+    @property
+    def assigned_to(self):
+        owner = self.behavior.tasks_owner[self.position]
+        return self.behavior.team.agents[owner] if owner >= 0 else None
+
+    __getitem__ = Task.__getitem__
+    get_action_by_id = Task.get_action_by_id
+    get_actions_ids = Task.get_actions_ids
+    get_prev_action_of = Task.get_prev_action_of
+    get_next_action_of = Task.get_next_action_of
+
+
+class ActionView:
+    """
+    view of an action of ArrayBehavior, with the interface of model.Action
+    """
+
+    __slots__ = ('behavior', 'position', 'id', 'task_id', 'name', 'constraints_init')
+
+    def __init__(self, behavior, position, action_name):
+        self.behavior = behavior
+        self.position = position
+        self.id = int(behavior.actions_ids[position])
+        self.name = action_name
+        self.constraints_init = tuple((int(behavior.tasks_ids[behavior.actions_task[constraint]]),
+                                       int(behavior.actions_ids[constraint]))
+                                      for constraint in behavior.actions_constraints[position])
+        self.task_id = int(behavior.tasks_ids[behavior.actions_task[position]])
+
+    @property
+    def status(self):
+        return ACTION_STATUSES[self.behavior.actions_status.item(self.position)]
+
+    @property
+    def assigned_to(self):
+        owner = self.behavior.actions_owner[self.position]
+        return self.behavior.team.agents[owner] if owner >= 0 else None
+
+    @property
+    def constraints(self):
+        """
+        list of (task_id, action_id) of constraining actions not completed yet
+        """
+        if not self.constraints_init:
+            return []
+        behavior = self.behavior
+        constraints_left = behavior.actions_constraints_left.item(self.position)
+        if constraints_left == 0:
+            return []
+        elif constraints_left == len(self.constraints_init):
+            return list(self.constraints_init)
+        else:
+            return [constraint for constraint, constraint_position
+                    in zip(self.constraints_init, behavior.actions_constraints[self.position])
+                    if behavior.actions_status.item(constraint_position) != ACTION_COMPLETED]
+
+
+class ArrayTeam:
+
+    id = None
+    name = None
+    agents = []             # AgentView for every agent
+    agents_index = None     # {agent_id: AgentView}
+
+    status = None           # rest / work
+    current_behavior = None
+
+    planner = None
+    score_tables = None     # ScoreTables of the scenario, kept between trials (built by the planner if None)
+
+    # ----- agents' state (arrays indexed by agent position) -----
+    agents_ids = None
+    agents_skills = None            # list of agents' skills (as in Agent.skills)
+    agents_status = None            # agent status codes
+    agents_task = None              # position of current task / -1
+    agents_action = None            # position of current action / -1
+    agents_exp_time_left = None     # values of expected time left for current action (agents x 4) / nan
+    agents_exp_time_full = None     # if expected time left is still the agent's fuzzy time for current action
+
+    sampler = None          # TrapezoidalSampler for actions' times / None for uniformly distributed times
+
+    logger = None
+    reporter = None
+
+    def __init__(self, team_specs, planner_type, logger, reporter, sampler=None):
+
+        self.id = team_specs['id']
+        self.name = team_specs['name']
+        self.agents_ids = np.array([agent_specs['id'] for agent_specs in team_specs['agents_specs']], dtype=np.int64)
+        self.agents_skills = [Agent.prepare_skills(agent_specs['skills']) for agent_specs in team_specs['agents_specs']]
+        self.agents = [AgentView(self, position, agent_specs['name'])
+                       for position, agent_specs in enumerate(team_specs['agents_specs'])]
+        self.agents_index = {}
+        for agent in self.agents:
+            self.agents_index.setdefault(agent.id, agent)
+
+        self.reset(planner_type, logger, reporter, sampler)
+
+    def reset(self, planner_type, logger, reporter, sampler=None):
+        """
+        restore team & agents to their initial state, for a new trial with the given planner
+        """
+        num_of_agents = len(self.agents_ids)
+
+        self.status = 'rest'
+        self.current_behavior = None
+        self.agents_status = np.full(num_of_agents, AGENT_REST, dtype=np.int8)
+        self.agents_task = np.full(num_of_agents, -1, dtype=np.int64)
+        self.agents_action = np.full(num_of_agents, -1, dtype=np.int64)
+        self.agents_exp_time_left = np.full((num_of_agents, 4), np.nan)
+        self.agents_exp_time_full = np.zeros(num_of_agents, dtype=bool)
+        self.sampler = sampler
+        self.logger = logger
+        self.reporter = reporter
+        self.planner = Planner(planner_type, self)
+
+    def assign_behavior(self, behavior):
+
+        self.current_behavior = behavior
+        self.status = 'work'
+        if self.current_behavior.status == 'available':
+            self.current_behavior.status = 'inprogress'
+            self.current_behavior.team = self
+        else:
+            raise ValueError('Cannot assign behavior %i with status `%s`'
+                             % (self.current_behavior.id, self.current_behavior.status))
+
+    def assign_tasks_to_agents(self):
+
+        if (self.agents_status == AGENT_REST).any() and (self.current_behavior.tasks_status == TASK_AVAILABLE).any():
+
+            # ask for assignments from planner
+            assignments = self.planner()
+
+            # assign tasks
+            for agent_id, task_id in assignments.items():
+                if task_id:
+                    # assign task to agent
+                    self.assign_task(self[agent_id].position, self.current_behavior[task_id].position)
+
+    def assign_task(self, agent, task):
+        """
+        assigns task to agent (positions) and self-assigns the first action of task to agent
+        """
+        behavior = self.current_behavior
+        if behavior.tasks_status[task] != TASK_AVAILABLE:
+            raise ValueError('Cannot assign task %i with status `%s`'
+                             % (behavior.tasks_ids[task], TASK_STATUSES[behavior.tasks_status[task]]))
+
+        # task assignment
+        first_action = behavior.tasks_first_action[task]
+        behavior.tasks_status[task] = TASK_INPROGRESS
+        behavior.tasks_owner[task] = agent
+        behavior.actions_status[first_action:first_action + behavior.tasks_num_of_actions[task]] = ACTION_INQUEUE
+        self.agents_task[agent] = task
+        self.logger.agent_assigned_task(int(self.agents_ids[agent]), int(behavior.tasks_ids[task]))
+
+        # action assignment
+        self.self_assign_action(agent, first_action)
+
+    def self_assign_action(self, agent, action):
+        """
+        assigns action (position) to agent, or puts agent at rest if action is -1 (no next action in task)
+        """
+        behavior = self.current_behavior
+        if action >= 0:
+            # assign next action
+            if behavior.actions_status[action] != ACTION_INQUEUE:
+                raise ValueError('Cannot assign action %i with status `%s`'
+                                 % (behavior.actions_ids[action], ACTION_STATUSES[behavior.actions_status[action]]))
+            task_id = int(behavior.tasks_ids[behavior.actions_task[action]])
+            action_id = int(behavior.actions_ids[action])
+            behavior.actions_status[action] = ACTION_INWAITING
+            behavior.actions_owner[action] = agent
+            self.agents_action[agent] = action
+            self.logger.agent_assigned_action(int(self.agents_ids[agent]), task_id, action_id, 'inwaiting')
+            self.reporter.report_action_robustness(task_id, action_id, self.agents_skills[agent][action_id]['r'])
+
+            if behavior.actions_constraints_left[action]:
+                # start waiting
+                self.agents_status[agent] = AGENT_WAIT
+                self.agents_exp_time_left[agent] = np.nan
+                self.agents_exp_time_full[agent] = False
+
+            else:
+                # start working
+                self.start_working(agent)
+
+        else:
+            # if no next action exists, put agent to rest
+            self.agents_status[agent] = AGENT_REST
+            self.agents_task[agent] = -1
+            self.agents_action[agent] = -1
+            self.agents_exp_time_left[agent] = np.nan
+            self.agents_exp_time_full[agent] = False
+            self.logger.agent_at_rest(int(self.agents_ids[agent]))
+
+    def start_working(self, agent):
+        """
+        agent (position) starts working on current action, once it is unconstrained
+        """
+        behavior = self.current_behavior
+        action = self.agents_action[agent]
+        agent_id = int(self.agents_ids[agent])
+        action_id = int(behavior.actions_ids[action])
+        fuzzy_time = self.agents_skills[agent][action_id]['t']
+
+        self.agents_status[agent] = AGENT_WORK
+        self.agents_exp_time_left[agent] = fuzzy_time.value
+        self.agents_exp_time_full[agent] = True
+        behavior.actions_status[action] = ACTION_INPROGRESS
+        if self.sampler:
+            # rv from trapezoidal distribution, drawn in batches by the sampler
+            behavior.actions_time_left[action] = self.sampler.sample((agent_id, action_id), fuzzy_time)
+        else:
+            # get rv from uniform distribution
+            behavior.actions_time_left[action] = randint(fuzzy_time.value[1], fuzzy_time.value[2])
+        self.logger.agent_started_working(agent_id, int(behavior.tasks_ids[behavior.actions_task[action]]),
+                                          action_id)
+
+    def complete_action(self, agent):
+        """
+        agent (position) completed current action - self-assigns next action of task / goes to rest
+        returns position of action completed
+        """
+        behavior = self.current_behavior
+        action = self.agents_action[agent]
+        behavior.actions_status[action] = ACTION_COMPLETED
+        behavior.actions_owner[action] = -1
+        behavior.actions_time_left[action] = np.nan
+        task = behavior.actions_task[action]
+        self.logger.action_completed(int(behavior.tasks_ids[task]), int(behavior.actions_ids[action]))
+
+        last_action = behavior.tasks_first_action[task] + behavior.tasks_num_of_actions[task] - 1
+        self.self_assign_action(agent, action + 1 if action < last_action else -1)
+        return action
+
+    def progress(self, timestep):
+
+        # assign tasks to resting agents
+        self.assign_tasks_to_agents()
+
+        behavior = self.current_behavior
+        actions_time_left = behavior.actions_time_left
+
+        # agents waiting for actions whose constraints have been met start working
+        waiting = np.flatnonzero(self.agents_status == AGENT_WAIT)
+        starting = waiting[behavior.actions_constraints_left[self.agents_action[waiting]] == 0]
+
+        # report agents' statuses
+        agents_status = self.agents_status.copy()
+        agents_status[starting] = AGENT_WORK
+        self.reporter.report_team_status(agents_status)
+
+        # make progress on the actions of agents already working (all at once)
+        working = np.flatnonzero(self.agents_status == AGENT_WORK)
+        actions_time_left[self.agents_action[working]] -= timestep
+        completing_mask = actions_time_left[self.agents_action[working]] <= 0
+        continuing = working[~completing_mask]
+        self.agents_exp_time_left[continuing] = np.maximum(self.agents_exp_time_left[continuing] - timestep, 0.0)
+        self.agents_exp_time_full[continuing] = False
+
+        # agents starting / completing actions draw actions' times, so they are handled one by one
+        # in the order of agents (same order of random draws as the object model)
+        actions_completed = []
+        starting = set(starting.tolist())
+        for agent in sorted(starting.union(working[completing_mask].tolist())):
+            if agent in starting:
+                self.start_working(agent)
+                action = self.agents_action[agent]
+                actions_time_left[action] -= timestep
+                if actions_time_left[action] > 0:
+                    self.agents_exp_time_left[agent] = np.maximum(self.agents_exp_time_left[agent] - timestep, 0.0)
+                    self.agents_exp_time_full[agent] = False
+                    continue
+            actions_completed.append(self.complete_action(agent))
+
+        # update behavior / tasks / actions statuses
+        behavior.update(actions_completed)
+
+        # check if progress blocked - behavior failed (instead of waiting until the time limit)
+        if behavior.status == 'inprogress' and self.is_blocked():
+            behavior.status = 'failed'
+            self.logger.behavior_failed(behavior.id)
+
+    def is_blocked(self):
+        """
+        Returns if no agent / task / action can ever change status (see Team.is_blocked)
+        """
+        if (self.agents_status == AGENT_WORK).any():
+            return False
+        waiting = np.flatnonzero(self.agents_status == AGENT_WAIT)
+        if (self.current_behavior.actions_constraints_left[self.agents_action[waiting]] == 0).any():
+            return False
+        return not ((self.agents_status == AGENT_REST).any()
+                    and (self.current_behavior.tasks_status == TASK_AVAILABLE).any())
+
+    def get_steps_to_next_event(self, timestep):
+        """
+        Returns number of steps that can pass before any agent / task / action changes status
+        0 if a change can happen in the next step, None if no change can ever happen
+        """
+        behavior = self.current_behavior
+
+        # a planning round is due
+        if (self.agents_status == AGENT_REST).any() and (behavior.tasks_status == TASK_AVAILABLE).any():
+            return 0
+
+        # an agent can start working
+        waiting = np.flatnonzero(self.agents_status == AGENT_WAIT)
+        if (behavior.actions_constraints_left[self.agents_action[waiting]] == 0).any():
+            return 0
+
+        # an agent can complete her action
+        working = np.flatnonzero(self.agents_status == AGENT_WORK)
+        if len(working):
+            steps_left = np.maximum(np.ceil(behavior.actions_time_left[self.agents_action[working]] / timestep), 1)
+            return int(steps_left.min()) - 1
+        return None
+
+    def skip(self, timestep, num_of_steps):
+        """
+        same as calling progress num_of_steps times, when no status changes in between
+        (see get_steps_to_next_event)
+        """
+        working = np.flatnonzero(self.agents_status == AGENT_WORK)
+        self.current_behavior.actions_time_left[self.agents_action[working]] -= timestep * num_of_steps
+        self.agents_exp_time_left[working] = \
+            np.maximum(self.agents_exp_time_left[working] - timestep * num_of_steps, 0.0)
+        self.agents_exp_time_full[working] = False
+        self.reporter.report_team_status(self.agents_status, num_of_steps)
+
+    def __getitem__(self, key):
+        return self.get_agent_by_id(key)
+
+    def get_agent_by_id(self, agent_id):
+        """
+        Get agent by id
+        Returns AgentView / None
+        """
+        return self.agents_index.get(agent_id)
+
+    def get_agents(self, status_filter=None):
+        """
+        Get agents by status
+        Returns list of AgentViews
+        """
+        if status_filter is None:
+            return list(self.agents)
+        elif status_filter in AGENT_STATUSES:
+            return [self.agents[agent]
+                    for agent in np.flatnonzero(self.agents_status == AGENT_STATUSES.index(status_filter)).tolist()]
+        else:
+            return []
+
+
+class AgentView:
+    """
+    view of an agent of ArrayTeam, with the interface of model.Agent (as used by planners & logger)
+    """
+
+    __slots__ = ('team', 'position', 'id', 'name', 'skills')
+
+    def __init__(self, team, position, agent_name):
+        self.team = team
+        self.position = position
+        self.id = int(team.agents_ids[position])
+        self.name = agent_name
+        self.skills = team.agents_skills[position]
+
+    @property
+    def status(self):
+        return AGENT_STATUSES[self.team.agents_status.item(self.position)]
+
+    @property
+    def current_task(self):
+        task = self.team.agents_task[self.position]
+        return self.team.current_behavior.tasks[task] if task >= 0 else None
+
+    @property
+    def current_action(self):
+        action = self.team.agents_action[self.position]
+        return self.team.current_behavior.actions[action] if action >= 0 else None
+
+    @property
+    def exp_time_left_action(self):
+        if self.team.agents_exp_time_full[self.position]:
+            # same object as in the object model, before any time has passed
+            return self.skills[self.current_action.id]['t']
+        value = self.team.agents_exp_time_left[self.position]
+        return None if np.isnan(value[0]) else fl.Fuzzy._from_trusted_value(tuple(value.tolist()))
+
+    calc_actions_tt = Agent.calc_actions_tt
+    calc_actions_mr = Agent.calc_actions_mr
+    calc_actions_me = Agent.calc_actions_me
@@ -0,0 +1,295 @@
+import fuzzy_logic as fl
+
+from heapq import heapify, heappush, heappop
+
+
+class BehaviorGraph:
+    """
+    dependency graph of the actions of a behavior (DAG) - every action depends on the previous action of its task
+    (an agent works on a task's actions in order) and on its constraints (actions of other tasks)
+    actions are sorted topologically once, and their fuzzy times are estimated by the mean of agents' times
+    for the remaining actions of the behavior (the ones not completed yet) it keeps:
+    - earliest start :: expected time for the actions it depends on to be completed (from the last update)
+    - tail           :: expected time from the start of the action to the end of the behavior (longest path)
+    - slack          :: time the action can be delayed without delaying the end of the behavior
+    and is updated incrementally as actions are completed, so that critical-path queries are O(1)
+    it is an API for planners only: the existing planners & helpers do not use it, as their expected times depend on
+    the agents assigned & the statuses of actions instead of the mean of agents' times
+    """
+
+    nodes = None            # list of (task_id, action_id) in the order of behavior's tasks & actions
+    nodes_index = None      # {(task_id, action_id): node}
+    tasks_nodes = None      # {task_id: list of nodes of task's actions (in order)}
+    successors = None       # list of lists of nodes depending on every node
+    predecessors = None     # list of lists of nodes every node depends on
+    order = None            # list of nodes in topological order
+    ranks = None            # list of position of every node in topological order
+
+    durations = None        # list of Fuzzy - mean of agents' times for every action
+    tails = None            # list of Fuzzy - time from the start of every action to the end of the behavior
+    tails_defuzzified = None
+
+    completed = None        # list of bool - if action has been completed
+    predecessors_left = None  # list of num of predecessors of every node not completed yet
+    earliest_starts = None  # list of Fuzzy - earliest start of every action (from the last update)
+    sources = None          # heap of (-tail, node) of remaining actions not depending on remaining ones
+    tasks_next = None       # {task_id: position of the next action of task not completed yet}
+
+    def __init__(self, tasks, agents):
+        """
+        tasks  :: list of Task (with actions' constraints_init)
+        agents :: list of Agent (with fuzzy times for every action of the tasks)
+        """
+        self.build([(task.id, [(action.id, action.constraints_init) for action in task.actions]) for task in tasks])
+
+        # ----- static times -----
+        self.durations = []
+        for task_id, action_id in self.nodes:
+            times = [agent.skills[action_id]['t'].value for agent in agents]
+            self.durations.append(fl.Fuzzy._from_trusted_value(tuple(sum(values) / len(times)
+                                                                     for values in zip(*times))))
+
+        self.tails = [None] * len(self.nodes)
+        for node in reversed(self.order):
+            successors_tails = [self.tails[successor] for successor in self.successors[node]]
+            self.tails[node] = self.durations[node] + max(successors_tails) if successors_tails \
+                else self.durations[node]
+        self.tails_defuzzified = [tail.defuzzify() for tail in self.tails]
+
+        self.reset()
+
+    @classmethod
+    def from_specs(cls, behavior_specs):
+        """
+        returns the graph of the actions of behavior specs, without times (e.g. for validating scenarios)
+        raises ValueError if constraints are unknown / cyclic
+        """
+        graph = cls.__new__(cls)
+        # constraints given as 'task_id-action_id' strings
+        graph.build([(task_specs['id'],
+                      [(action_id, [tuple(map(int, constraint.split('-')))
+                                    for constraint in task_specs['constraints'].get(action_id, [])])
+                       for action_id in task_specs['action_list']])
+                     for task_specs in behavior_specs['tasks_specs']])
+        return graph
+
+    def build(self, tasks_actions):
+        """
+        builds the nodes & edges of the graph and sorts them topologically
+        tasks_actions :: list of (task_id, list of (action_id, constraints)) in the order of behavior's tasks
+        """
+
+        # ----- nodes -----
+        self.nodes = []
+        self.nodes_index = {}
+        self.tasks_nodes = {}
+        for task_id, actions in tasks_actions:
+            task_nodes = self.tasks_nodes.setdefault(task_id, [])
+            for action_id, _ in actions:
+                self.nodes_index.setdefault((task_id, action_id), len(self.nodes))
+                task_nodes.append(len(self.nodes))
+                self.nodes.append((task_id, action_id))
+
+        # ----- edges -----
+        self.successors = [[] for _ in self.nodes]
+        self.predecessors = [[] for _ in self.nodes]
+        for task_id, actions in tasks_actions:
+            task_nodes = self.tasks_nodes[task_id]
+            for position, (action_id, constraints) in enumerate(actions):
+                node = task_nodes[position]
+                dependencies = [task_nodes[position - 1]] if position else []
+                for constraint in constraints:
+                    if constraint not in self.nodes_index:
+                        raise ValueError('Unknown constraint `%s-%s` of action %s of task %s'
+                                         % (constraint + (action_id, task_id)))
+                    dependencies.append(self.nodes_index[constraint])
+                for dependency in dependencies:
+                    self.successors[dependency].append(node)
+                    self.predecessors[node].append(dependency)
+
+        self.order = self.sort_topologically()
+        self.ranks = [0] * len(self.nodes)
+        for rank, node in enumerate(self.order):
+            self.ranks[node] = rank
+
+    def sort_topologically(self):
+        """
+        returns list of nodes in topological order
+        raises ValueError if dependencies are cyclic
+        """
+        predecessors_left = [len(predecessors) for predecessors in self.predecessors]
+        order = [node for node, num in enumerate(predecessors_left) if num == 0]
+        for node in order:
+            for successor in self.successors[node]:
+                predecessors_left[successor] -= 1
+                if predecessors_left[successor] == 0:
+                    order.append(successor)
+
+        if len(order) < len(self.nodes):
+            cycle = self.find_cycle(predecessors_left)
+            raise ValueError('Cyclic dependencies between actions of behavior: %s'
+                             % ' -> '.join('%s-%s' % self.nodes[node] for node in cycle + cycle[:1]))
+        return order
+
+    def find_cycle(self, predecessors_left):
+        """
+        returns list of nodes of a cycle (each one depending on the previous one)
+        predecessors_left :: list of num of predecessors of every node left unsorted (> 0 for nodes in / after cycles)
+        """
+        # every node left unsorted depends on another one left unsorted, so following them backwards ends in a cycle
+        node = next(node for node, num in enumerate(predecessors_left) if num > 0)
+        path = []
+        positions = {}
+        while node not in positions:
+            positions[node] = len(path)
+            path.append(node)
+            node = next(predecessor for predecessor in self.predecessors[node] if predecessors_left[predecessor] > 0)
+        return list(reversed(path[positions[node]:]))
+
+    def reset(self):
+        """
+        restores the state of the graph to no action completed (for a new trial)
+        """
+        zero = fl.Fuzzy((0, 0))
+        self.completed = [False] * len(self.nodes)
+        self.predecessors_left = [len(predecessors) for predecessors in self.predecessors]
+        self.earliest_starts = [None] * len(self.nodes)
+        for node in self.order:
+            starts = [self.earliest_starts[predecessor] + self.durations[predecessor]
+                      for predecessor in self.predecessors[node]]
+            self.earliest_starts[node] = max(starts) if starts else zero
+        self.sources = [(-self.tails_defuzzified[node], node) for node, num in enumerate(self.predecessors_left)
+                        if num == 0]
+        self.sources.sort()
+        self.tasks_next = {task_id: 0 for task_id in self.tasks_nodes}
+
+    # ----- updates -----
+
+    def complete(self, task_id, action_id):
+        """
+        updates the graph for an action completed
+        earliest starts are only recalculated for the remaining actions depending on it (in topological order)
+        """
+        node = self.nodes_index[(task_id, action_id)]
+        if self.completed[node]:
+            return
+        self.completed[node] = True
+        task_nodes = self.tasks_nodes[task_id]
+        while self.tasks_next[task_id] < len(task_nodes) and self.completed[task_nodes[self.tasks_next[task_id]]]:
+            self.tasks_next[task_id] += 1
+
+        for successor in self.successors[node]:
+            self.predecessors_left[successor] -= 1
+            if self.predecessors_left[successor] == 0:
+                heappush(self.sources, (-self.tails_defuzzified[successor], successor))
+
+        # ----- propagate earlier starts -----
+        to_update = [(self.ranks[successor], successor) for successor in self.successors[node]]
+        heapify(to_update)
+        queued = set(self.successors[node])
+        while to_update:
+            _, successor = heappop(to_update)
+            starts = [self.earliest_starts[predecessor] + self.durations[predecessor]
+                      for predecessor in self.predecessors[successor] if not self.completed[predecessor]]
+            earliest_start = max(starts) if starts else fl.Fuzzy((0, 0))
+            if earliest_start.value != self.earliest_starts[successor].value:
+                self.earliest_starts[successor] = earliest_start
+                for next_successor in self.successors[successor]:
+                    if next_successor not in queued:
+                        queued.add(next_successor)
+                        heappush(to_update, (self.ranks[next_successor], next_successor))
+
+    def sync(self, behavior):
+        """
+        updates the graph for the actions completed in behavior since the last update
+        (only the next action of every task is checked, as task's actions are completed in order)
+        """
+        for task_id, task_nodes in self.tasks_nodes.items():
+            while self.tasks_next[task_id] < len(task_nodes):
+                task = behavior[task_id]
+                if task.status == 'available':
+                    break
+                _, action_id = self.nodes[task_nodes[self.tasks_next[task_id]]]
+                if task[action_id].status != 'completed':
+                    break
+                self.complete(task_id, action_id)
+
+    # ----- queries -----
+
+    def get_makespan(self):
+        """
+        returns Fuzzy expected time to complete the remaining actions (from the last update) / None if none left
+        """
+        while self.sources and self.completed[self.sources[0][1]]:
+            heappop(self.sources)
+        return self.tails[self.sources[0][1]] if self.sources else None
+
+    def get_earliest_start(self, task_id, action_id):
+        return self.earliest_starts[self.nodes_index[(task_id, action_id)]]
+
+    def get_latest_start(self, task_id, action_id):
+        """
+        returns Fuzzy latest time action can start without delaying the end of the behavior / None if none left
+        """
+        makespan = self.get_makespan()
+        if makespan is None:
+            return None
+        return makespan - self.tails[self.nodes_index[(task_id, action_id)]]
+
+    def get_slack(self, task_id, action_id):
+        """
+        returns defuzzified time action can be delayed without delaying the end of the behavior
+        0 if critical / if no actions are left
+        """
+        makespan = self.get_makespan()
+        if makespan is None:
+            return 0.0
+        node = self.nodes_index[(task_id, action_id)]
+        return max(makespan.defuzzify() - self.earliest_starts[node].defuzzify()
+                   - self.tails_defuzzified[node], 0.0)
+
+    def get_priority(self, task_id, action_id=None):
+        """
+        returns critical-path priority of an action / of the next action of a task (if action_id is None)
+        as the defuzzified time from its start to the end of the behavior - 0 for a completed task
+        """
+        if action_id is None:
+            task_nodes = self.tasks_nodes[task_id]
+            if self.tasks_next[task_id] == len(task_nodes):
+                return 0.0
+            return self.tails_defuzzified[task_nodes[self.tasks_next[task_id]]]
+        return self.tails_defuzzified[self.nodes_index[(task_id, action_id)]]
+
+    def is_critical(self, task_id, action_id):
+        return self.get_slack(task_id, action_id) < 1e-9
+
+    def get_critical_path(self):
+        """
+        returns list of (task_id, action_id) of the longest chain of remaining actions
+        """
+        node = self.sources[0][1] if self.get_makespan() is not None else None
+        path = []
+        while node is not None:
+            path.append(self.nodes[node])
+            successors = self.successors[node]
+            node = max(successors, key=lambda successor: self.tails_defuzzified[successor]) if successors else None
+        return path
+
+
+if __name__ == '__main__':
+
+    from scenario import Scenario
+    from model import Behavior, Team
+
+    # ----- critical path of a scenario -----
+    scenario = Scenario('salad', None)
+    actions_names, behavior_specs, team_specs, time_max = scenario()
+    behavior = Behavior(behavior_specs, actions_names, None)
+    team = Team(team_specs, 'base', None, None)
+    graph = BehaviorGraph(behavior.tasks, team.agents)
+
+    print('Expected makespan (single agent per action, no waiting for agents):', graph.get_makespan())
+    for task_id, action_id in graph.get_critical_path():
+        print('%s-%s  %-35s  earliest start %6.1f  priority %6.1f' % (
+            task_id, action_id, actions_names[action_id],
+            graph.get_earliest_start(task_id, action_id).defuzzify(), graph.get_priority(task_id, action_id)))
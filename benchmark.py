@@ -0,0 +1,301 @@
+from simulation import Simulation
+from sim_logger import Logger
+import simulation as sim
+import fuzzy_logic as fl
+import helpers
+
+from time import perf_counter
+from timeit import timeit
+
+
+def get_simulation_settings(scenario_type, scenario_id, simulation_id, planner, engine='event', model='object'):
+    """
+    returns settings of a silent simulation (no logging / no reports) run by the event engine
+    on the object model by default
+    """
+    return {
+        'experiment_id': None,
+        'scenario_type': scenario_type,
+        'scenario_id': scenario_id,
+        'simulation_id': simulation_id,
+        'planner': planner,
+        'logger_verbose_level': False,
+        'reporter_print': False,
+        'reporter_export': False,
+        'engine': engine,
+        'model': model,
+    }
+
+
+# -------------------- Planner latency -------------------- #
+
+def time_planner_calls(simulation):
+    """
+    runs a simulation and times every call to its planner
+    before each planner call, also times the evaluation of the expected times to complete
+    every available task by every agent, with and without a memo table
+    returns lists of latencies (sec) - (planner, exp_times_without_memo, exp_times_with_memo)
+    """
+    team = simulation.team
+    planner_latencies = []
+    no_memo_latencies = []
+    memo_latencies = []
+
+    selected_planner = team.planner.selected_planner
+
+    def timed_planner():
+
+        tasks = [team.current_behavior[task_id]
+                 for task_id in team.current_behavior.get_tasks_ids(status_filter='available')]
+
+        start = perf_counter()
+        for agent in team.agents:
+            for task in tasks:
+                helpers.calc_exp_time_to_complete_next_task(team, agent, task)
+        no_memo_latencies.append(perf_counter() - start)
+
+        start = perf_counter()
+        exp_times_memo = {}
+        for agent in team.agents:
+            for task in tasks:
+                helpers.calc_exp_time_to_complete_next_task(team, agent, task, exp_times_memo)
+        memo_latencies.append(perf_counter() - start)
+
+        start = perf_counter()
+        assignments = selected_planner()
+        planner_latencies.append(perf_counter() - start)
+        return assignments
+
+    team.planner.selected_planner = timed_planner
+    simulation()
+
+    return planner_latencies, no_memo_latencies, memo_latencies
+
+
+def benchmark_planner_latency(settings):
+    """
+    prints how the latency of planner calls scales with the number of agents and tasks
+    """
+    print('Planner `%s` latency (ms per call, mean over %s scenarios)'
+          % (settings['planner'], settings['num_of_scenarios']))
+    print(' Agents | Tasks | Calls | Planner | Exp. times (no memo) | Exp. times (memo)')
+
+    for num_of_agents, num_of_tasks in settings['scenario_sizes']:
+
+        planner_latencies = []
+        no_memo_latencies = []
+        memo_latencies = []
+
+        for scenario_id in range(1000000, 1000000 + settings['num_of_scenarios']):
+            simulation = Simulation(get_simulation_settings(
+                'custom_%s_%s' % (num_of_agents, num_of_tasks), scenario_id, 1000, settings['planner']))
+            latencies = time_planner_calls(simulation)
+            planner_latencies += latencies[0]
+            no_memo_latencies += latencies[1]
+            memo_latencies += latencies[2]
+
+        def mean_ms(latencies):
+            return 1000 * sum(latencies) / len(latencies)
+
+        print(' %6s | %5s | %5s | %7.3f | %20.3f | %17.3f'
+              % (num_of_agents, num_of_tasks, len(planner_latencies),
+                 mean_ms(planner_latencies), mean_ms(no_memo_latencies), mean_ms(memo_latencies)))
+
+
+# -------------------- Fuzzy operations -------------------- #
+
+def benchmark_fuzzy_operations(settings):
+    """
+    prints the time needed per fuzzy operation, compared to the same operation
+    building its result through the validating constructor
+    """
+    a = fl.Fuzzy((4, 9))
+    b = fl.Fuzzy((21, 32))
+    value = (a + b).value
+
+    operations = {
+        # name: (operation, operation building result through validation)
+        'create': (lambda: fl.Fuzzy._from_trusted_value(value),
+                   lambda: fl.Fuzzy(value=value)),
+        'add': (lambda: a + b,
+                lambda: fl.Fuzzy(value=tuple(sum(x) for x in zip(a.value, b.value)))),
+        'sub': (lambda: a - b,
+                lambda: fl.Fuzzy(value=(a.value[0] - b.value[3], a.value[1] - b.value[2],
+                                        a.value[2] - b.value[1], a.value[3] - b.value[0]))),
+        'roll_left': (lambda: a.roll_left(1.0),
+                      lambda: fl.Fuzzy(value=tuple(max(v - 1.0, 0.0) for v in a.value))),
+        'defuzzify': (lambda: a.defuzzify(),
+                      lambda: (a.value[0] + 2 * a.value[1] + 2 * a.value[2] + a.value[3]) / 6),
+    }
+
+    print('Fuzzy operations (ns per operation, %s repetitions)' % settings['repetitions'])
+    print(' Operation | Validated | Current | Saving')
+    for name, (operation, validated_operation) in operations.items():
+        validated_ns = 1e9 * timeit(validated_operation, number=settings['repetitions']) / settings['repetitions']
+        current_ns = 1e9 * timeit(operation, number=settings['repetitions']) / settings['repetitions']
+        print(' %9s | %9.1f | %7.1f | %5.1f%%'
+              % (name, validated_ns, current_ns, 100 * (validated_ns - current_ns) / validated_ns))
+
+
+# -------------------- Logger overhead -------------------- #
+
+class CheckingLogger(Logger):
+    """
+    logger keeping every method bound, so disabled ones check their verbose level on every call
+    """
+    def disable_methods(self):
+        pass
+
+
+def time_trials(settings, scenario_type, logger_class):
+    """
+    runs a trial for every scenario of a scenario type with the given logger class (logging disabled)
+    returns the time (sec) spent per trial, excluding the building of the simulations
+    """
+    default_logger_class = sim.Logger
+    sim.Logger = logger_class
+    try:
+        time_spent = 0.0
+        for scenario_id in range(1000000, 1000000 + settings['num_of_scenarios']):
+            simulation = Simulation(get_simulation_settings(scenario_type, scenario_id, 1000, settings['planner'],
+                                                            settings['engine']))
+            start = perf_counter()
+            simulation()
+            time_spent += perf_counter() - start
+        return time_spent / settings['num_of_scenarios']
+    finally:
+        sim.Logger = default_logger_class
+
+
+def benchmark_logger_overhead(settings):
+    """
+    prints the time saved per trial when disabled logging methods are bound to no-ops
+    instead of checking the verbose level on every call
+    """
+    print('Trials with logging disabled (ms per trial, `%s` planner, %s engine, mean over %s scenarios)'
+          % (settings['planner'], settings['engine'], settings['num_of_scenarios']))
+    print(' Agents | Tasks | Checking | No-ops | Saving')
+
+    for num_of_agents, num_of_tasks in settings['scenario_sizes']:
+        scenario_type = 'custom_%s_%s' % (num_of_agents, num_of_tasks)
+        checking_ms = 1000 * time_trials(settings, scenario_type, CheckingLogger)
+        no_ops_ms = 1000 * time_trials(settings, scenario_type, Logger)
+        print(' %6s | %5s | %8.2f | %6.2f | %5.1f%%'
+              % (num_of_agents, num_of_tasks, checking_ms, no_ops_ms, 100 * (checking_ms - no_ops_ms) / checking_ms))
+
+
+# -------------------- Simulation models -------------------- #
+
+def time_trial(simulation):
+    """
+    runs a simulation and times it
+    returns times (sec) - (planner calls, rest of the simulation) and num of planner calls
+    """
+    planner_time = 0.0
+    planner_calls = 0
+    selected_planner = simulation.team.planner.selected_planner
+
+    def timed_planner():
+        nonlocal planner_time, planner_calls
+        start = perf_counter()
+        assignments = selected_planner()
+        planner_time += perf_counter() - start
+        planner_calls += 1
+        return assignments
+
+    simulation.team.planner.selected_planner = timed_planner
+    start = perf_counter()
+    simulation()
+    return planner_time, perf_counter() - start - planner_time, planner_calls
+
+
+def benchmark_simulation_models(settings):
+    """
+    prints the time per trial of the object model and the array model,
+    split into the time spent by the planner and by the rest of the simulation
+    """
+    print('Trials per model (ms per trial, `%s` planner, %s engine, mean over %s scenarios)'
+          % (settings['planner'], settings['engine'], settings['num_of_scenarios']))
+    print(' Agents | Tasks |  Model | Planner |    Rest')
+
+    for num_of_agents, num_of_tasks in settings['scenario_sizes']:
+        for model in ['object', 'array']:
+            planner_time = 0.0
+            rest_time = 0.0
+            for scenario_id in range(1000000, 1000000 + settings['num_of_scenarios']):
+                simulation = Simulation(get_simulation_settings(
+                    'custom_%s_%s' % (num_of_agents, num_of_tasks), scenario_id, 1000, settings['planner'],
+                    settings['engine'], model))
+                times = time_trial(simulation)
+                planner_time += times[0]
+                rest_time += times[1]
+            print(' %6s | %5s | %6s | %7.1f | %7.1f'
+                  % (num_of_agents, num_of_tasks, model, 1000 * planner_time / settings['num_of_scenarios'],
+                     1000 * rest_time / settings['num_of_scenarios']))
+
+
+# -------------------- Planner quality -------------------- #
+
+def benchmark_planner_quality(settings):
+    """
+    prints the latency of planner calls next to the quality of the schedules produced (time spent & robustness),
+    e.g. for comparing the optimal assignments of new+ planners against the greedy planners
+    """
+    print('Planners (mean over %s scenarios x %s simulations, %s engine)'
+          % (settings['num_of_scenarios'], settings['num_of_simulations'], settings['engine']))
+    print(' Agents | Tasks |      Planner | Latency ms |  Nodes | Time spent | Robustness')
+
+    for num_of_agents, num_of_tasks in settings['scenario_sizes']:
+        for planner in settings['planners']:
+            planner_time = 0.0
+            planner_calls = 0
+            nodes_explored = []
+            time_spent = []
+            robustness = []
+            for scenario_id in range(1000000, 1000000 + settings['num_of_scenarios']):
+                for simulation_id in range(1000, 1000 + settings['num_of_simulations']):
+                    # results are exported (to be collected from the trial report), but not saved
+                    simulation = Simulation({**get_simulation_settings(
+                        'custom_%s_%s' % (num_of_agents, num_of_tasks), scenario_id, simulation_id, planner,
+                        settings['engine']), 'reporter_export': True, 'reporter_export_handler': Logger.ignore})
+                    times = time_trial(simulation)
+                    planner_time += times[0]
+                    planner_calls += times[2]
+                    nodes_explored += [nodes for nodes, _ in simulation.team.planner.search_stats]
+                    time_spent.append(simulation.reporter.trial_report['time_spent'])
+                    robustness.append(simulation.reporter.trial_report['robustness'])
+            # nodes explored are reported by search planners only
+            print(' %6s | %5s | %12s | %10.3f | %6s | %10.2f | %10.2f'
+                  % (num_of_agents, num_of_tasks, planner, 1000 * planner_time / max(planner_calls, 1),
+                     '%.0f' % (sum(nodes_explored) / len(nodes_explored)) if nodes_explored else '-',
+                     sum(time_spent) / len(time_spent), sum(robustness) / len(robustness)))
+
+
+if __name__ == '__main__':
+
+    # ----- prepare settings -----
+    benchmark_settings = {
+        'benchmark': 'planner_latency',     # planner_latency / fuzzy_operations / logger_overhead / simulation_models
+                                            # / planner_quality
+        'planner': 'new-0.5',
+        'planners': ['dpv1', 'dpv2', 'new-0.5', 'new+-0.5', 'beam-4', 'mcts-50'],      # planner_quality only
+        'engine': 'event',                  # tick / event (logger_overhead, simulation_models & planner_quality)
+        'scenario_sizes': [(2, 10), (5, 20), (5, 50), (10, 50), (10, 100), (20, 200)],     # (agents, tasks)
+        'num_of_scenarios': 3,
+        'num_of_simulations': 3,            # planner_quality only
+        'repetitions': 1000000,
+    }
+
+    # ----- run benchmark -----
+    if benchmark_settings['benchmark'] == 'planner_latency':
+        benchmark_planner_latency(benchmark_settings)
+    elif benchmark_settings['benchmark'] == 'fuzzy_operations':
+        benchmark_fuzzy_operations(benchmark_settings)
+    elif benchmark_settings['benchmark'] == 'logger_overhead':
+        benchmark_logger_overhead(benchmark_settings)
+    elif benchmark_settings['benchmark'] == 'simulation_models':
+        benchmark_simulation_models(benchmark_settings)
+    elif benchmark_settings['benchmark'] == 'planner_quality':
+        benchmark_planner_quality(benchmark_settings)
+    else:
+        raise ValueError('Unknown benchmark: `%s`' % benchmark_settings['benchmark'])
@@ -1,6 +1,8 @@
-
 from simulation import Simulation
+from scenario import ScenarioCache
+from sim_reporter import ResultSink, ParquetResultSink, CompletionLedger, get_csv_path, get_parquet_path
 
+from multiprocessing import Pool
 import random
 
 
@@ -12,6 +14,18 @@ class Experiment:
     num_of_simulations = None
     planners = None
 
+    num_of_workers = None   # 1 runs trials serially, more fans them out to a process pool
+    flush_every = None      # num of results rows buffered before they are written to the report
+    report_format = None    # csv / parquet
+    resume = None           # skip trials already saved in the report
+    engine = None           # tick / event (engine of every trial)
+    model = None            # object / array (model of every trial)
+    duration_model = None   # uniform / trapezoidal (distribution of actions' times of every trial)
+
+    scenario_cache_size = None      # num of generated scenarios kept in memory (per process)
+    scenario_library = None         # directory of serialized scenarios / None
+    reuse_simulations = None        # reset the simulation of the previous trial when run on the same scenario
+
     def __init__(self, settings):
 
         # ----- init experiment -----
@@ -20,19 +34,58 @@ class Experiment:
         self.num_of_scenarios = settings['num_of_scenarios']
         self.num_of_simulations = settings['num_of_simulations']
         self.planners = settings['planners']
+        self.num_of_workers = settings.get('num_of_workers', 1)
+        self.flush_every = settings.get('flush_every', 1000)
+        self.report_format = settings.get('report_format', 'csv')
+        self.resume = settings.get('resume', True)
+        self.engine = settings.get('engine', 'tick')
+        self.model = settings.get('model', 'object')
+        self.duration_model = settings.get('duration_model', 'uniform')
+        self.scenario_cache_size = settings.get('scenario_cache_size', 8)
+        self.scenario_library = settings.get('scenario_library')
+        self.reuse_simulations = settings.get('reuse_simulations', True)
+
+        if not (isinstance(self.num_of_workers, int) and self.num_of_workers > 0):
+            raise ValueError('Invalid num_of_workers: `%s`' % self.num_of_workers)
+        if self.report_format not in ['csv', 'parquet']:
+            raise ValueError('Unknown report_format: `%s`' % self.report_format)
 
     def __call__(self):
 
         # ----- run experiment -----
         random.seed(self.id)
         scenario_ids = random.sample(range(1000000, 9999999), k=self.num_of_scenarios) \
-            if self.scenario_type.split('_')[0] == 'custom' else [None]
+            if self.scenario_type.split('_')[0] in ['custom', 'large'] else [None]
         simulation_ids = random.sample(range(100000, 999999), k=self.num_of_simulations)
 
         print('Experiment started ...')
 
-        trial_num = 0
-
+        # ----- find trials already completed -----
+        ledger = CompletionLedger()
+        if self.resume:
+            if self.report_format == 'csv':
+                ledger.load_csv(get_csv_path(self.id, self.scenario_type), self.id)
+            else:
+                ledger.load_parquet(get_parquet_path(self.scenario_type), self.id)
+            if len(ledger):
+                print('Resuming experiment - skipping %s trials already completed ...' % len(ledger))
+
+        if self.report_format == 'csv':
+            sink = ResultSink(get_csv_path(self.id, self.scenario_type), self.flush_every)
+        else:
+            sink = ParquetResultSink(get_parquet_path(self.scenario_type), self.id, self.flush_every)
+
+        with sink:
+            if self.num_of_workers == 1:
+                self.run_serial(scenario_ids, simulation_ids, ledger, sink)
+            else:
+                self.run_parallel(scenario_ids, simulation_ids, ledger, sink)
+
+    def get_trials_settings(self, scenario_ids, simulation_ids, ledger):
+        """
+        yields the settings of every trial of the experiment not found in ledger,
+        in the order they are run / reported
+        """
         for scenario_id in scenario_ids:
 
             for simulation_id in simulation_ids:
@@ -46,19 +99,96 @@ class Experiment:
                         'scenario_id': scenario_id,
                         'simulation_id': simulation_id,
                         'planner': planner,
+                        'engine': self.engine,
+                        'model': self.model,
+                        'duration_model': self.duration_model,
                         'logger_verbose_level': False,
                         'reporter_print': False,
                         'reporter_export': True,
                     }
 
-                    # todo skip if row exists - place experiment size in filename
+                    if (self.id, scenario_id, simulation_id, planner) in ledger:
+                        continue
+
+                    yield sim_settings
 
-                    trial_num += 1
-                    if trial_num % 100 == 0:
-                        print('Starting trial #%s ...' % trial_num)
+    def run_serial(self, scenario_ids, simulation_ids, ledger, sink):
 
-                    # ----- run simulation -----
-                    Simulation(sim_settings)()
+        trial_num = 0
+        scenario_cache = ScenarioCache(self.scenario_cache_size, self.scenario_library)
+        simulation = None
+
+        for sim_settings in self.get_trials_settings(scenario_ids, simulation_ids, ledger):
+
+            trial_num += 1
+            if trial_num % 100 == 0:
+                print('Starting trial #%s ...' % trial_num)
+
+            # ----- run simulation -----
+            sim_settings = {**sim_settings, 'reporter_export_handler': sink.write, 'scenario_cache': scenario_cache}
+            simulation = get_simulation(sim_settings, simulation if self.reuse_simulations else None)
+            simulation()
+
+    def run_parallel(self, scenario_ids, simulation_ids, ledger, sink):
+        """
+        every worker builds and runs its own simulations
+        results are gathered in trial order and written by this process only (through sink),
+        so the report is identical to the one produced by a serial run
+        """
+        trials_settings = self.get_trials_settings(scenario_ids, simulation_ids, ledger)
+
+        with Pool(processes=self.num_of_workers, initializer=init_worker,
+                  initargs=(self.scenario_cache_size, self.scenario_library, self.reuse_simulations)) as pool:
+            for trial_num, rows in enumerate(pool.imap(run_trial, trials_settings, chunksize=4), start=1):
+
+                if trial_num % 100 == 0:
+                    print('Completed trial #%s ...' % trial_num)
+
+                # ----- save results -----
+                for row in rows:
+                    sink.write(row)
+
+
+def get_simulation(sim_settings, prev_simulation=None):
+    """
+    returns the simulation of a trial
+    prev_simulation is reset and reused when it was run on the same scenario,
+    so behavior & team are not rebuilt from the scenario's specs for every trial
+    """
+    if prev_simulation is not None and prev_simulation.scenario_type == sim_settings['scenario_type'] \
+            and prev_simulation.scenario_id == sim_settings['scenario_id']:
+        prev_simulation.reset(sim_settings)
+        return prev_simulation
+
+    return Simulation(sim_settings)
+
+
+# scenario cache & last simulation of a worker process of a parallel experiment
+worker_scenario_cache = None
+worker_reuse_simulations = None
+worker_simulation = None
+
+
+def init_worker(scenario_cache_size, scenario_library, reuse_simulations=True):
+    """
+    initializes a worker process of a parallel experiment
+    """
+    global worker_scenario_cache, worker_reuse_simulations
+    worker_scenario_cache = ScenarioCache(scenario_cache_size, scenario_library)
+    worker_reuse_simulations = reuse_simulations
+
+
+def run_trial(sim_settings):
+    """
+    runs a single trial (used by the worker processes of a parallel experiment)
+    returns the results rows exported by the trial instead of writing them to the report
+    """
+    global worker_simulation
+    rows = []
+    sim_settings = {**sim_settings, 'reporter_export_handler': rows.append, 'scenario_cache': worker_scenario_cache}
+    worker_simulation = get_simulation(sim_settings, worker_simulation if worker_reuse_simulations else None)
+    worker_simulation()
+    return rows
 
 
 if __name__ == "__main__":
@@ -66,10 +196,20 @@ if __name__ == "__main__":
     # ----- prepare settings -----
     experiment_settings = {
         'experiment_id': 1000,
-        'scenario_type': 'custom_5_20',     # salad / cereal / custom_2_7 (agents, tasks)
-        'num_of_scenarios': 100,            # num of different scenarios to be generated (custom scenarios only)
+        'scenario_type': 'custom_5_20',     # salad / cereal / custom_2_7 / large_1000_10000 (agents, tasks)
+        'num_of_scenarios': 100,            # num of different scenarios to be generated (custom / large scenarios only)
         'num_of_simulations': 10,           # num of times each scenario to be run
         'planners': ['base', 'base+', 'dpv1', 'dpv2', 'new-0.0', 'new-0.5', 'new-1.0'],
+        'num_of_workers': 1,                # num of processes running trials in parallel
+        'flush_every': 1000,                # num of results rows buffered before they are written to the report
+        'report_format': 'csv',             # csv / parquet (needs pyarrow)
+        'resume': True,                     # skip trials already saved in the report
+        'engine': 'tick',                   # tick (fixed time steps) / event (jump to next event) - same results
+        'model': 'object',                  # object / array (numpy arrays, faster for large scenarios with base / base+ / dpv1 / dpv2 only) - same results
+        'scenario_cache_size': 8,           # num of generated scenarios kept in memory
+        'scenario_library': None,           # directory for saving / loading generated scenarios (e.g. 'scenarios')
+        'reuse_simulations': True,          # reset (instead of rebuild) the simulation of consecutive trials of a scenario
+        'duration_model': 'uniform',        # uniform / trapezoidal (distribution of actions' times)
     }
 
     # ----- run experiment -----
@@ -1,6 +1,7 @@
 
 from numbers import Number
 from scipy.stats import trapz
+import numpy as np
 
 
 def is_fuzzy_value(a):
@@ -13,7 +14,10 @@ def is_interval_value(a):
 
 class Fuzzy:
 
-    value = None    # quadruple of non-strictly increasing numbers
+    __slots__ = (
+        'value',            # quadruple of non-strictly increasing numbers
+        'defuzzified',      # crisp value of fuzzy number (calculated once needed)
+    )
 
     def __init__(self, interval=None, slack=0.1, value=None):
         """
@@ -22,6 +26,7 @@ class Fuzzy:
         if value is given, interval and slack are ignored
         """
 
+        self.defuzzified = None
         if is_fuzzy_value(value):
             self.value = value
         elif is_interval_value(interval) and isinstance(slack, Number):
@@ -33,8 +38,21 @@ class Fuzzy:
             raise ValueError('Not valid parameters for building Fuzzy object - interval=%s, slack=%s, value=%s'
                              % (interval, slack, value))
 
+    @classmethod
+    def _from_trusted_value(cls, value):
+        """
+        create a fuzzy number object from a value known to be valid, skipping validation
+        used for results of operations that preserve the ordering of the quadruple
+        """
+        fuzzy = object.__new__(cls)
+        fuzzy.value = value
+        fuzzy.defuzzified = None
+        return fuzzy
+
     def defuzzify(self):
-        return (self.value[0] + 2 * self.value[1] + 2 * self.value[2] + self.value[3]) / 6
+        if self.defuzzified is None:
+            self.defuzzified = (self.value[0] + 2 * self.value[1] + 2 * self.value[2] + self.value[3]) / 6
+        return self.defuzzified
 
     def get_random_value(self):
         """
@@ -52,6 +70,26 @@ class Fuzzy:
         r = trapz.rvs(c, d, loc=loc, scale=scale)
         return r
 
+    def get_random_values(self, size, random_state=None):
+        """
+        get an array of random values from the trapezoidal distribution based on the fuzzy number
+        (see get_random_value)
+        """
+
+        # trapezoidal distribution parameters
+        loc = self.value[0]
+        scale = self.value[3] - self.value[0]
+
+        if scale == 0:
+            # crisp number - every value is the same
+            return np.full(size, float(loc))
+
+        c = (self.value[1] - self.value[0]) / scale
+        d = (self.value[2] - self.value[0]) / scale
+
+        # random values from trapezoidal distribution
+        return trapz.rvs(c, d, loc=loc, scale=scale, size=size, random_state=random_state)
+
     # ----- Get Fuzzy Number / Point -----
 
     def __repr__(self):
@@ -72,11 +110,11 @@ class Fuzzy:
         if other is None:
             return None
         elif isinstance(other, Fuzzy):
-            result = tuple(sum(x) for x in zip(self.value, other.value))
-            return Fuzzy(value=result)
+            a, b = self.value, other.value
+            return Fuzzy._from_trusted_value((a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3]))
         elif isinstance(other, Number):
-            result = tuple(i + other for i in self.value)
-            return Fuzzy(value=result)
+            a = self.value
+            return Fuzzy._from_trusted_value((a[0] + other, a[1] + other, a[2] + other, a[3] + other))
         else:
             raise TypeError("unsupported operand type(s) for +: 'Fuzzy' and '%s'" % type(other))
 
@@ -84,35 +122,35 @@ class Fuzzy:
         if other is None:
             return None
         elif isinstance(other, Fuzzy):
-            result = (self.value[0] - other.value[3],
-                      self.value[1] - other.value[2],
-                      self.value[2] - other.value[1],
-                      self.value[3] - other.value[0])
-            return Fuzzy(value=result)
+            a, b = self.value, other.value
+            return Fuzzy._from_trusted_value((a[0] - b[3], a[1] - b[2], a[2] - b[1], a[3] - b[0]))
         elif isinstance(other, Number):
-            result = tuple(v - other for v in self.value)
-            return Fuzzy(value=result)
+            a = self.value
+            return Fuzzy._from_trusted_value((a[0] - other, a[1] - other, a[2] - other, a[3] - other))
         else:
             raise TypeError("unsupported operand type(s) for -: 'Fuzzy' and '%s'" % type(other))
 
     def __mul__(self, other):
         if isinstance(other, Number):
             result = tuple(v * other for v in self.value)
-            return Fuzzy(value=result)
+            # negative numbers reverse the ordering of the quadruple, so these results are validated
+            return Fuzzy._from_trusted_value(result) if other >= 0 else Fuzzy(value=result)
         else:
             raise TypeError("unsupported operand type(s) for *: 'Fuzzy' and '%s'" % type(other))
 
     def __truediv__(self, other):
         if isinstance(other, Number):
             result = tuple(v / other for v in self.value)
-            return Fuzzy(value=result)
+            # negative numbers reverse the ordering of the quadruple, so these results are validated
+            return Fuzzy._from_trusted_value(result) if other > 0 else Fuzzy(value=result)
         else:
             raise TypeError("unsupported operand type(s) for /: 'Fuzzy' and '%s'" % type(other))
 
     def roll_left(self, other):
         if isinstance(other, Number):
-            result = tuple(max(v - other, 0.0) for v in self.value)
-            return Fuzzy(value=result)
+            a = self.value
+            return Fuzzy._from_trusted_value((max(a[0] - other, 0.0), max(a[1] - other, 0.0),
+                                              max(a[2] - other, 0.0), max(a[3] - other, 0.0)))
         else:
             raise TypeError("unsupported operand type(s) for -: 'Fuzzy' and '%s'" % type(other))
 
@@ -150,3 +188,181 @@ class Fuzzy:
             return self.defuzzify() <= other.defuzzify()
         else:
             raise TypeError("'<=' not supported between instances of 'Fuzzy' and '%s'" % type(other))
+
+
+class TrapezoidalSampler:
+
+    seed = None
+    batch_size = None
+    buffers = None      # {key: [rng, values, position of next value to be served]}
+
+    def __init__(self, seed, batch_size=64):
+        """
+        serves random values from the trapezoidal distributions of fuzzy numbers
+        values are drawn in batches per key (e.g. (agent_id, action_id)) from a random stream seeded by
+        (seed, key), so the values served for a key are reproducible and do not depend on other keys
+        """
+        self.seed = seed
+        self.batch_size = batch_size
+        self.buffers = {}
+
+    def sample(self, key, fuzzy):
+        """
+        returns the next random value for key, from the trapezoidal distribution of fuzzy
+        the same fuzzy number is expected for every call with the same key
+        """
+        buffer = self.buffers.get(key)
+        if buffer is None:
+            buffer = [np.random.default_rng([self.seed, *key]), [], 0]
+            self.buffers[key] = buffer
+
+        if buffer[2] == len(buffer[1]):
+            # buffer exhausted - draw next batch
+            buffer[1] = fuzzy.get_random_values(self.batch_size, random_state=buffer[0]).tolist()
+            buffer[2] = 0
+
+        value = buffer[1][buffer[2]]
+        buffer[2] += 1
+        return value
+
+
+class FuzzyArray:
+
+    values = None   # numpy array of shape (..., 4) - one quadruple of non-strictly increasing numbers per item
+
+    def __init__(self, values):
+        """
+        create an array of fuzzy numbers from an array-like of quadruples
+        operations are applied item-wise, exactly as the corresponding Fuzzy operations
+        """
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 0 or values.shape[-1] != 4 or np.any(np.diff(values, axis=-1) < 0):
+            raise ValueError('Not valid values for building FuzzyArray object - values of shape %s'
+                             % (values.shape, ))
+        self.values = values
+
+    @classmethod
+    def from_fuzzies(cls, fuzzies):
+        """
+        create an array of fuzzy numbers from a (nested) list of Fuzzy objects
+        """
+        def get_values(item):
+            return item.value if isinstance(item, Fuzzy) else [get_values(i) for i in item]
+        return cls(get_values(fuzzies))
+
+    def defuzzify(self):
+        v = self.values
+        return (v[..., 0] + 2 * v[..., 1] + 2 * v[..., 2] + v[..., 3]) / 6
+
+    # ----- Get Fuzzy Numbers -----
+
+    @property
+    def shape(self):
+        return self.values.shape[:-1]
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __repr__(self):
+        return 'FuzzyArray object: ' + str(self.values)
+
+    def __getitem__(self, key):
+        """
+        returns Fuzzy if a single item is selected, FuzzyArray otherwise
+        """
+        values = self.values[key]
+        if values.ndim == 1:
+            return Fuzzy._from_trusted_value(tuple(values.tolist()))
+        else:
+            return FuzzyArray(values)
+
+    def to_fuzzies(self):
+        """
+        returns a (nested) list of Fuzzy objects
+        """
+        def get_fuzzies(values):
+            if values and not isinstance(values[0], list):
+                return Fuzzy._from_trusted_value(tuple(values))
+            else:
+                return [get_fuzzies(v) for v in values]
+        return get_fuzzies(self.values.tolist())
+
+    # ----- Numeric Operations -----
+
+    @staticmethod
+    def get_crisp_values(other):
+        """
+        returns numbers / crisp arrays in a shape that can be broadcast against the fuzzy values
+        """
+        if isinstance(other, Number):
+            return other
+        elif isinstance(other, np.ndarray) and np.issubdtype(other.dtype, np.number):
+            return other[..., np.newaxis]
+        else:
+            return None
+
+    def __add__(self, other):
+        if other is None:
+            return None
+        elif isinstance(other, (Fuzzy, FuzzyArray)):
+            other_values = other.values if isinstance(other, FuzzyArray) else np.asarray(other.value, dtype=float)
+            return FuzzyArray(self.values + other_values)
+        elif self.get_crisp_values(other) is not None:
+            return FuzzyArray(self.values + self.get_crisp_values(other))
+        else:
+            raise TypeError("unsupported operand type(s) for +: 'FuzzyArray' and '%s'" % type(other))
+
+    def __sub__(self, other):
+        if other is None:
+            return None
+        elif isinstance(other, (Fuzzy, FuzzyArray)):
+            other_values = other.values if isinstance(other, FuzzyArray) else np.asarray(other.value, dtype=float)
+            return FuzzyArray(self.values - other_values[..., ::-1])
+        elif self.get_crisp_values(other) is not None:
+            return FuzzyArray(self.values - self.get_crisp_values(other))
+        else:
+            raise TypeError("unsupported operand type(s) for -: 'FuzzyArray' and '%s'" % type(other))
+
+    def __mul__(self, other):
+        if self.get_crisp_values(other) is not None:
+            return FuzzyArray(self.values * self.get_crisp_values(other))
+        else:
+            raise TypeError("unsupported operand type(s) for *: 'FuzzyArray' and '%s'" % type(other))
+
+    def __truediv__(self, other):
+        if self.get_crisp_values(other) is not None:
+            return FuzzyArray(self.values / self.get_crisp_values(other))
+        else:
+            raise TypeError("unsupported operand type(s) for /: 'FuzzyArray' and '%s'" % type(other))
+
+    def roll_left(self, other):
+        if isinstance(other, Number):
+            return FuzzyArray(np.maximum(self.values - other, 0.0))
+        else:
+            raise TypeError("unsupported operand type(s) for -: 'FuzzyArray' and '%s'" % type(other))
+
+    # ----- Comparison Operations -----
+    """
+    compare defuzzified values item-wise, returns arrays of booleans
+    """
+
+    def get_defuzzified_values(self, other, operator):
+        if isinstance(other, (Fuzzy, FuzzyArray)):
+            return other.defuzzify()
+        else:
+            raise TypeError("'%s' not supported between instances of 'FuzzyArray' and '%s'" % (operator, type(other)))
+
+    def __eq__(self, other):
+        return self.defuzzify() == self.get_defuzzified_values(other, '==')
+
+    def __gt__(self, other):
+        return self.defuzzify() > self.get_defuzzified_values(other, '>')
+
+    def __ge__(self, other):
+        return self.defuzzify() >= self.get_defuzzified_values(other, '>=')
+
+    def __lt__(self, other):
+        return self.defuzzify() < self.get_defuzzified_values(other, '<')
+
+    def __le__(self, other):
+        return self.defuzzify() <= self.get_defuzzified_values(other, '<=')
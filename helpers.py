@@ -1,31 +1,41 @@
 
 import fuzzy_logic as fl
+import numpy as np
 
 
 def get_available_tasks_with_constraints_num(behavior):
     """
     returns {task_id : constraints_num}
     """
-    tasks_available = {}
-    for task in behavior.tasks:
-        if task.status == 'available':
-            """
-            many different actions of a task can have many different constraints
-            """
-            constraints_num = 0
-            for action in task.actions:
-                constraints_num += len(action.constraints)
-            tasks_available[task.id] = constraints_num
-    return tasks_available
-
-
-def calc_exp_times_for_action(team, task_id, action_id):
+    return behavior.get_tasks_constraints_num(status_filter='available')
+
+
+def calc_exp_times_for_action(team, task_id, action_id, memo=None):
     """
     returns (time_to_start, time_to_complete) fuzzy number for expected time
 
     time_to_start    :: fuzzy time - expected time for prev actions & involved constraints to completed
     time_to_complete :: fuzzy time - expected time for action to complete once it has started
     None when tasks/constraints involved still not assigned
+
+    memo :: dict {(task_id, action_id): (time_to_start, time_to_complete)} or None
+    expected times only depend on the current statuses of agents & actions, so a memo table
+    can be shared by all calculations of a planning round (statuses do not change while planning)
+    but should be discarded once the team has made any progress
+    """
+    if memo is not None and (task_id, action_id) in memo:
+        return memo[(task_id, action_id)]
+
+    exp_times = eval_exp_times_for_action(team, task_id, action_id, memo)
+
+    if memo is not None:
+        memo[(task_id, action_id)] = exp_times
+    return exp_times
+
+
+def eval_exp_times_for_action(team, task_id, action_id, memo=None):
+    """
+    evaluates expected times for action (see calc_exp_times_for_action)
     """
 
     # available / inprogress / completed
@@ -49,13 +59,14 @@ def calc_exp_times_for_action(team, task_id, action_id):
 
         elif team.current_behavior[task_id][action_id].status == 'inqueue':
             time_for_constraints_to_be_met = \
-                calc_exp_time_for_constraints(team, team.current_behavior[task_id][action_id])
+                calc_exp_time_for_constraints(team, team.current_behavior[task_id][action_id], memo)
             time_to_complete = team.current_behavior[task_id].assigned_to.skills[action_id]['t']
 
             if time_for_constraints_to_be_met:
 
                 prev_action = team.current_behavior[task_id].get_prev_action_of(action_id)
-                prev_time_to_start, prev_time_to_complete = calc_exp_times_for_action(team, task_id, prev_action.id)
+                prev_time_to_start, prev_time_to_complete = \
+                    calc_exp_times_for_action(team, task_id, prev_action.id, memo)
                 if prev_time_to_start is not None:
                     time_to_complete_prev_actions = prev_time_to_start + prev_time_to_complete
                 else:
@@ -74,7 +85,7 @@ def calc_exp_times_for_action(team, task_id, action_id):
 
         elif team.current_behavior[task_id][action_id].status == 'inwaiting':
             time_for_constraints_to_be_met = \
-                calc_exp_time_for_constraints(team, team.current_behavior[task_id][action_id])
+                calc_exp_time_for_constraints(team, team.current_behavior[task_id][action_id], memo)
             time_to_start = time_for_constraints_to_be_met
             time_to_complete = team.current_behavior[task_id][action_id].assigned_to.skills[action_id]['t']
             return time_to_start, time_to_complete
@@ -96,7 +107,7 @@ def calc_exp_times_for_action(team, task_id, action_id):
         raise ValueError('Invalid task status')
 
 
-def calc_exp_time_for_constraints(team, action):
+def calc_exp_time_for_constraints(team, action, memo=None):
     """
     calculates expected time for constraints of action to be met
     returns Fuzzy / None
@@ -106,10 +117,9 @@ def calc_exp_time_for_constraints(team, action):
     """
 
     constraints_times = []
-    for constraint in action.constraints:
-        constraining_task_id, constraining_action_id = map(int, constraint.split('-'))
+    for constraining_task_id, constraining_action_id in action.constraints:
         constraint_time_to_start, constraint_time_to_complete = \
-            calc_exp_times_for_action(team, constraining_task_id, constraining_action_id)
+            calc_exp_times_for_action(team, constraining_task_id, constraining_action_id, memo)
         constraint_time_total = \
             constraint_time_to_start + constraint_time_to_complete if constraint_time_to_start else None
         if constraint_time_total:
@@ -129,7 +139,7 @@ def calc_exp_time_for_constraints(team, action):
         return max(constraints_times)
 
 
-def calc_exp_time_to_complete_current_task(team, agent):
+def calc_exp_time_to_complete_current_task(team, agent, memo=None):
 
     if agent.current_task:
         # get id of current task
@@ -137,7 +147,8 @@ def calc_exp_time_to_complete_current_task(team, agent):
         # get id of last action of current task
         last_action_id = agent.current_task.get_prev_action_of().id
         # get expected times (time_to_start, time_to_complete) for last action of current task
-        action_time_to_start, action_time_to_complete = calc_exp_times_for_action(team, curr_task_id, last_action_id)
+        action_time_to_start, action_time_to_complete = \
+            calc_exp_times_for_action(team, curr_task_id, last_action_id, memo)
         if action_time_to_start:
             return action_time_to_start + action_time_to_complete
         else:
@@ -146,16 +157,16 @@ def calc_exp_time_to_complete_current_task(team, agent):
         return fl.Fuzzy((0, 0))
 
 
-def calc_exp_time_to_complete_next_task(team, agent, task):
+def calc_exp_time_to_complete_next_task(team, agent, task, memo=None):
 
-    time_needed_so_far = calc_exp_time_to_complete_current_task(team, agent)
+    time_needed_so_far = calc_exp_time_to_complete_current_task(team, agent, memo)
     if time_needed_so_far is None:
         return None
 
     for action in task.actions:
 
         # ----- calc expected time for constraints of action to be met ----- #
-        time_for_constraints_to_be_met = calc_exp_time_for_constraints(team, action)
+        time_for_constraints_to_be_met = calc_exp_time_for_constraints(team, action, memo)
 
         # ----- get expected time for agent to complete action once she has started it ----- #
         time_for_agent_to_complete_action = agent.skills[action.id]['t']
@@ -173,3 +184,43 @@ def calc_exp_time_to_complete_next_task(team, agent, task):
             return None
 
     return time_needed_so_far
+
+
+def calc_actions_tt_table(agents, tasks):
+    """
+    get total time needed for each agent to complete all actions of each task
+    (same as Agent.calc_actions_tt for every agent x task)
+    returns FuzzyArray of shape (agents, tasks)
+    """
+    max_actions_num = max([len(task.actions) for task in tasks], default=0)
+
+    # skills' fuzzy times for the action at each position of each task - zeros past the end of each task
+    skills_values = np.zeros((max_actions_num, len(agents), len(tasks), 4))
+    for agent_index, agent in enumerate(agents):
+        for task_index, task in enumerate(tasks):
+            for position, action in enumerate(task.actions):
+                skills_values[position, agent_index, task_index] = agent.skills[action.id]['t'].value
+
+    # add up times in the order of the actions
+    tt = fl.FuzzyArray(np.zeros((len(agents), len(tasks), 4)))
+    for position in range(max_actions_num):
+        tt += fl.FuzzyArray(skills_values[position])
+    return tt
+
+
+def calc_actions_mr_table(agents, tasks):
+    """
+    get minimum robustness expected from each agent across all actions of each task
+    (same as Agent.calc_actions_mr for every agent x task)
+    returns numpy array of shape (agents, tasks)
+    """
+    return np.array([[agent.calc_actions_mr(task.get_actions_ids()) for task in tasks] for agent in agents])
+
+
+def calc_actions_me_table(agents, tasks):
+    """
+    get maximum error expected from each agent across all actions of each task
+    (same as Agent.calc_actions_me for every agent x task)
+    returns numpy array of shape (agents, tasks)
+    """
+    return np.array([[agent.calc_actions_me(task.get_actions_ids()) for task in tasks] for agent in agents])
@@ -0,0 +1,296 @@
+from heapq import heappush, heappop
+from math import log, sqrt
+from multiprocessing import Pool, current_process
+from time import perf_counter
+import atexit
+import random
+
+# Monte Carlo Tree Search over the assignments of resting agents (used by Planner.mcts_planner)
+# the state of the team is captured in a snapshot of plain python data, so searches can run in worker processes
+# every search draws actions' times from its own random.Random (seeded by the planner), never from the module rng
+# which drives the simulation itself
+
+EXPLORATION = sqrt(2)     # UCT exploration constant (for rewards normalized to [0, 1])
+
+
+def get_snapshot(team):
+    """
+    returns the state of the team relevant to the remaining behavior, as plain python data
+
+    resting   :: list of ids of resting agents (in the order their tasks are decided)
+    available :: list of ids of available tasks
+    agents    :: {agent_id: list of (task_id, action_id, time_left) of actions left in agent's current task}
+                 time_left :: (low, high) interval of time expected to be left for action in progress / None
+    actions   :: {task_id: list of action_id} of available tasks
+    constraints :: {(task_id, action_id): tuple of (task_id, action_id) of constraints not met yet}
+    skills    :: {agent_id: {action_id: (low, high)}} core interval of agents' times for actions not completed yet
+    tasks_times :: {agent_id: {task_id: mean time}} of agents for available tasks
+    """
+    behavior = team.current_behavior
+    agents = team.get_agents()
+
+    resting = [agent.id for agent in agents if agent.status == 'rest']
+    available = behavior.get_tasks_ids(status_filter='available')
+    actions = {task_id: behavior[task_id].get_actions_ids() for task_id in available}
+
+    actions_left = {}
+    constraints = {}
+    agents_actions = {}
+    for agent in agents:
+        agent_actions = []
+        if agent.current_task is not None:
+            for action in agent.current_task.actions:
+                if action.status == 'completed':
+                    continue
+                time_left = None
+                if action.status == 'inprogress':
+                    exp_time_left = agent.exp_time_left_action
+                    time_left = exp_time_left.value[1], exp_time_left.value[2]
+                agent_actions.append((agent.current_task.id, action.id, time_left))
+                actions_left[action.id] = None
+                constraints[(agent.current_task.id, action.id)] = tuple(action.constraints)
+        agents_actions[agent.id] = agent_actions
+
+    for task_id in available:
+        for action in behavior[task_id].actions:
+            actions_left[action.id] = None
+            constraints[(task_id, action.id)] = tuple(action.constraints)
+
+    skills = {agent.id: {action_id: (agent.skills[action_id]['t'].value[1], agent.skills[action_id]['t'].value[2])
+                         for action_id in actions_left}
+              for agent in agents}
+
+    tasks_times = {agent_id: {task_id: sum(low + high for low, high in (agent_skills[action_id]
+                                                                        for action_id in actions[task_id])) / 2
+                              for task_id in available}
+                   for agent_id, agent_skills in skills.items()}
+
+    return {
+        'resting': resting,
+        'available': available,
+        'agents': agents_actions,
+        'actions': actions,
+        'constraints': constraints,
+        'skills': skills,
+        'tasks_times': tasks_times,
+    }
+
+
+def rollout(snapshot, decisions, world, rng):
+    """
+    plays out the remaining behavior once, with resting agents assigned the tasks of decisions
+    (and then every agent picking one of the available tasks least constrained, at random, when at rest)
+    actions' times are drawn uniformly from agents' core intervals, the same way as Action.setup does,
+    the first time they are needed in world {(agent_id, action_id): time} - and reused by later rollouts in it
+    returns the time the behavior is completed (makespan) - penalized if agents end up waiting forever
+    """
+    skills = snapshot['skills']
+    constraints = snapshot['constraints']
+    actions = snapshot['actions']
+    decided = dict(zip(snapshot['resting'], decisions))
+
+    available = [task_id for task_id in snapshot['available'] if task_id not in decisions]
+    queues = {agent_id: list(agent_actions) for agent_id, agent_actions in snapshot['agents'].items()}
+    for agent_id, task_id in decided.items():
+        if task_id is not None:
+            queues[agent_id] = [(task_id, action_id, None) for action_id in actions[task_id]]
+
+    completed = {}          # {(task_id, action_id): time completed}
+    waiting = {}            # {(task_id, action_id): list of (time, agent_id) waiting for action to be completed}
+    agents_heap = [(0.0, agent_id) for agent_id in queues]
+    makespan = 0.0
+
+    while agents_heap:
+        agent_time, agent_id = heappop(agents_heap)
+        queue = queues[agent_id]
+
+        # ----- agent at rest picks next task -----
+        if not queue:
+            if not available:
+                continue
+            task_id = pick_task(available, actions, constraints, completed, snapshot['tasks_times'][agent_id])
+            available.remove(task_id)
+            queue.extend((task_id, action_id, None) for action_id in actions[task_id])
+
+        # ----- agent starts next action once its constraints are met -----
+        task_id, action_id, time_left = queue[0]
+        start = agent_time
+        for constraint in constraints[(task_id, action_id)]:
+            if constraint not in completed:
+                waiting.setdefault(constraint, []).append((agent_time, agent_id))
+                break
+            start = max(start, completed[constraint])
+        else:
+            duration = world.get((agent_id, action_id))
+            if duration is None:
+                if time_left is None:
+                    low, high = skills[agent_id][action_id]
+                    duration = rng.randint(low, high)
+                else:
+                    duration = rng.uniform(*time_left)
+                world[(agent_id, action_id)] = duration
+            end = start + duration
+            completed[(task_id, action_id)] = end
+            makespan = max(makespan, end)
+            queue.pop(0)
+            heappush(agents_heap, (end, agent_id))
+            for waiting_agent in waiting.pop((task_id, action_id), []):
+                heappush(agents_heap, waiting_agent)
+
+    if waiting or available:
+        # deadlock - remaining actions could never be completed, each one penalized by the longest action time
+        max_time = max(high for agent_skills in skills.values() for _, high in agent_skills.values())
+        return makespan + max_time * (len(constraints) - len(completed))
+    return makespan
+
+
+def pick_task(available, actions, constraints, completed, tasks_times):
+    """
+    returns the available task with the least constraints not met yet, taking the agent the least time
+    """
+    def key(task_id):
+        constraints_num = sum(1 for action_id in actions[task_id]
+                              for constraint in constraints[(task_id, action_id)] if constraint not in completed)
+        return constraints_num, tasks_times[task_id]
+
+    return min(available, key=key)
+
+
+def search(snapshot, budget, max_rollouts, seed):
+    """
+    runs MCTS for budget (sec of wall-clock time) or max_rollouts, whichever is exhausted first - at least one rollout
+    (0 for no limit of that kind - searches limited by rollouts only are reproducible from their seed)
+    tree levels are the decisions for resting agents (in order), nodes are identified by the decisions made so far
+    the n-th rollout of every node is played in the n-th world of actions' times (common random numbers),
+    so alternative decisions are compared on the same draws
+    returns {decisions: [num of rollouts, sum of makespans]} for every node of the tree
+    """
+    start = perf_counter()
+    rng = random.Random(seed)
+    resting = snapshot['resting']
+    stats = {(): [0, 0.0]}
+    worlds = []
+    min_makespan = float('inf')
+    max_makespan = 0.0
+
+    while stats[()][0] == 0 or ((not max_rollouts or stats[()][0] < max_rollouts)
+                                and (not budget or perf_counter() - start < budget)):
+
+        # ----- selection & expansion -----
+        decisions = ()
+        while len(decisions) < len(resting):
+            options = [task_id for task_id in snapshot['available'] if task_id not in decisions] or [None]
+            untried = [task_id for task_id in options if decisions + (task_id, ) not in stats]
+            if untried:
+                # options are tried in the order the rollouts' policy prefers them
+                decisions += (pick_task(untried, snapshot['actions'], snapshot['constraints'], {},
+                                        snapshot['tasks_times'][resting[len(decisions)]])
+                              if untried != [None] else None, )
+                stats[decisions] = [0, 0.0]
+                break
+            decisions += (select_child(stats, decisions, options, min_makespan, max_makespan), )
+
+        # ----- simulation -----
+        world_index = stats[decisions][0]
+        if world_index == len(worlds):
+            worlds.append({})
+        makespan = rollout(snapshot, decisions, worlds[world_index], rng)
+        min_makespan = min(min_makespan, makespan)
+        max_makespan = max(max_makespan, makespan)
+
+        # ----- backpropagation -----
+        for depth in range(len(decisions) + 1):
+            node_stats = stats[decisions[:depth]]
+            node_stats[0] += 1
+            node_stats[1] += makespan
+
+    return stats
+
+
+def select_child(stats, decisions, options, min_makespan, max_makespan):
+    """
+    returns the option of maximum UCT score (shorter mean makespans normalized to higher rewards in [0, 1])
+    """
+    parent_visits = stats[decisions][0]
+    makespan_range = max_makespan - min_makespan or 1.0
+
+    def uct(task_id):
+        visits, makespans = stats[decisions + (task_id, )]
+        reward = (max_makespan - makespans / visits) / makespan_range
+        return reward + EXPLORATION * sqrt(log(parent_visits) / visits)
+
+    return max(options, key=uct)
+
+
+def best_decisions(stats, snapshot):
+    """
+    returns the decisions for resting agents, choosing at every level the most visited child
+    (ties broken by shorter mean makespan) - or the one preferred by the rollouts' policy, for levels not searched
+    """
+    decisions = ()
+    while len(decisions) < len(snapshot['resting']):
+        options = [task_id for task_id in snapshot['available'] if task_id not in decisions]
+        children = [(visits, -makespans / visits, decisions + (task_id, ))
+                    for task_id in options + [None]
+                    for visits, makespans in [stats.get(decisions + (task_id, ), (0, 0.0))] if visits]
+        if children:
+            decisions = max(children)[2]
+        elif options:
+            decisions += (pick_task(options, snapshot['actions'], snapshot['constraints'], {},
+                                    snapshot['tasks_times'][snapshot['resting'][len(decisions)]]), )
+        else:
+            decisions += (None, )
+    return decisions
+
+
+# ----- worker processes -----
+
+# pools of worker processes running searches {num_of_workers: Pool}, shared by all planners of the process
+pools = {}
+
+
+def get_pool(num_of_workers):
+    """
+    returns a pool of worker processes / None if searches should run in this process
+    (a single worker, or a process that cannot have children - e.g. a worker of a parallel experiment)
+    """
+    if num_of_workers <= 1 or current_process().daemon:
+        return None
+    if num_of_workers not in pools:
+        pools[num_of_workers] = Pool(processes=num_of_workers)
+    return pools[num_of_workers]
+
+
+@atexit.register
+def close_pools():
+    for pool in pools.values():
+        pool.terminate()
+    pools.clear()
+
+
+def run_search(args):
+    return search(*args)
+
+
+def parallel_search(snapshot, budget, max_rollouts, seeds, num_of_workers):
+    """
+    runs independent searches (one per seed) in the worker processes, merging their statistics (root parallelization)
+    every search runs within budget (sec) of wall-clock time and its share of max_rollouts (see search)
+    without a pool the searches run one after the other, sharing the budget - so searches limited by rollouts only
+    give the same results in a worker of a parallel experiment
+    returns merged {decisions: [num of rollouts, sum of makespans]}
+    """
+    search_rollouts = -(-max_rollouts // len(seeds))
+    pool = get_pool(num_of_workers)
+    if pool is None:
+        results = [search(snapshot, budget / len(seeds), search_rollouts, seed) for seed in seeds]
+    else:
+        results = pool.map(run_search, [(snapshot, budget, search_rollouts, seed) for seed in seeds])
+
+    stats = {}
+    for result in results:
+        for decisions, (visits, makespans) in result.items():
+            node_stats = stats.setdefault(decisions, [0, 0.0])
+            node_stats[0] += visits
+            node_stats[1] += makespans
+    return stats
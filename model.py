@@ -1,8 +1,10 @@
 
 import fuzzy_logic as fl
 from planners import Planner
+from skill_table import AgentSkills
 
 from random import randint
+from math import ceil
 
 
 class Behavior:
@@ -10,8 +12,10 @@ class Behavior:
     id = None
     name = None
     tasks = []
+    tasks_index = None      # {task_id: Task}
+    dependents = None       # {(task_id, action_id): [Action]} actions constrained by each action
 
-    status = None           # available / inprogress / completed
+    status = None           # available / inprogress / completed / failed
 
     logger = None
 
@@ -22,28 +26,63 @@ class Behavior:
             actions = []
             for action_id in task_specs['action_list']:
                 action_name = actions_names[action_id]
-                action_constraints = task_specs['constraints'].get(action_id, [])
-                actions.append(Action(action_id, action_name, action_constraints, logger))
+                # constraints given as 'task_id-action_id' strings
+                action_constraints = [tuple(map(int, constraint.split('-')))
+                                      for constraint in task_specs['constraints'].get(action_id, [])]
+                actions.append(Action(task_specs['id'], action_id, action_name, action_constraints, logger))
             tasks.append(Task(task_specs['id'], task_specs['name'], actions, logger))
 
         self.id = behavior_specs['id']
         self.name = behavior_specs['name']
         self.tasks = tasks
+        self.tasks_index = {}
+        for task in tasks:
+            self.tasks_index.setdefault(task.id, task)
+        self.dependents = {}
+        for task in tasks:
+            for action in task.actions:
+                for constraint in action.constraints:
+                    self.dependents.setdefault(constraint, []).append(action)
         self.status = 'available'
         self.logger = logger
 
-    def update(self):
+    def update(self, actions_completed=None):
+        """
+        actions_completed :: list of Actions completed since last update
+        only the tasks of the completed actions and the actions depending on them are updated
+        if None, every task / action is checked
+        """
 
-        # check if tasks completed / constraints removed
-        for task in self.tasks:
-            task.update(self)
+        if actions_completed is None:
+            # check if tasks completed / constraints removed
+            for task in self.tasks:
+                task.update(self)
+            tasks_changed = True
+
+        else:
+            tasks_changed = False
+            for action in actions_completed:
+                # remove constraints met by completed action
+                for dependent_action in self.dependents.get((action.task_id, action.id), []):
+                    dependent_action.remove_constraint((action.task_id, action.id))
+                # check if task completed
+                tasks_changed = self[action.task_id].update_status() or tasks_changed
 
         # check if behavior completed
-        if all([True if task.status == 'completed' else False for task in self.tasks]):
+        if tasks_changed and all([True if task.status == 'completed' else False for task in self.tasks]):
             # behavior completed
             self.status = 'completed'
             self.logger.behavior_completed(self.id)
 
+    def reset(self, logger):
+        """
+        restore behavior, tasks & actions to their initial state (as built), for a new trial
+        """
+        self.status = 'available'
+        self.logger = logger
+        for task in self.tasks:
+            task.reset(logger)
+
     def __getitem__(self, key):
         return self.get_task_by_id(key)
 
@@ -52,11 +91,7 @@ class Behavior:
         Get task by id
         Returns Task / None
         """
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        else:
-            return None
+        return self.tasks_index.get(task_id)
 
     def get_tasks_ids(self, status_filter=None):
         """
@@ -69,12 +104,44 @@ class Behavior:
                 tasks_list.append(task.id)
         return tasks_list
 
+    def get_tasks_constraints_num(self, status_filter=None):
+        """
+        Get num of constraints not met yet of the actions of tasks by status
+        Returns {task_id: constraints_num}
+        """
+        tasks_constraints_num = {}
+        for task in self.tasks:
+            if task.status == status_filter or status_filter is None:
+                # many different actions of a task can have many different constraints
+                constraints_num = 0
+                for action in task.actions:
+                    constraints_num += len(action.constraints)
+                tasks_constraints_num[task.id] = constraints_num
+        return tasks_constraints_num
+
+    def get_tasks_constrained(self, status_filter=None):
+        """
+        Get if any action of tasks by status has constraints not met yet
+        Returns {task_id: bool}
+        """
+        tasks_constrained = {}
+        for task in self.tasks:
+            if task.status == status_filter or status_filter is None:
+                tasks_constrained[task.id] = False
+                for action in task.actions:
+                    if action.constraints:
+                        tasks_constrained[task.id] = True
+                        break
+        return tasks_constrained
+
 
 class Task:
 
     id = None
     name = None
     actions = []
+    actions_index = None        # {action_id: Action}
+    actions_positions = None    # {action_id: position of action in task's actions}
 
     status = None           # available / inprogress / completed
     assigned_to = None      # Agent / None
@@ -85,6 +152,11 @@ class Task:
         self.id = task_id
         self.name = task_name
         self.actions = task_actions
+        self.actions_index = {}
+        self.actions_positions = {}
+        for position, action in enumerate(task_actions):
+            self.actions_index.setdefault(action.id, action)
+            self.actions_positions.setdefault(action.id, position)
         self.status = 'available'
         self.logger = logger
 
@@ -103,16 +175,34 @@ class Task:
     def update(self, behavior):
 
         # check if task is completed
+        self.update_status()
+
+        # update actions - check if constraints removed
+        if self.status != 'completed':
+            for action in self.actions:
+                action.update(behavior)
+
+    def update_status(self):
+        """
+        Returns if task has just been completed
+        """
         if self.status != 'completed':
             if all([True if action.status == 'completed' else False for action in self.actions]):
                 # all actions of task completed - task completed
                 self.status = 'completed'
                 self.logger.task_completed(self.id)
+                return True
+        return False
 
-        # update actions - check if constraints removed
-        if self.status != 'completed':
-            for action in self.actions:
-                action.update(behavior)
+    def reset(self, logger):
+        """
+        restore task & actions to their initial state
+        """
+        self.status = 'available'
+        self.assigned_to = None
+        self.logger = logger
+        for action in self.actions:
+            action.reset(logger)
 
     def __getitem__(self, key):
         return self.get_action_by_id(key)
@@ -122,11 +212,7 @@ class Task:
         Get action by id
         Returns Action / None
         """
-        for action in self.actions:
-            if action.id == action_id:
-                return action
-        else:
-            return None
+        return self.actions_index.get(action_id)
 
     def get_actions_ids(self):  # , status_filter=None):
         """
@@ -144,14 +230,11 @@ class Task:
         returns None if action is the first action
         raises error if action wan not in task
         """
-        last_action = None
-        for action in self.actions:
-            if action.id == action_id:
-                return last_action
-            else:
-                last_action = action
         if action_id is None:
-            return last_action
+            return self.actions[-1] if self.actions else None
+        elif action_id in self.actions_positions:
+            position = self.actions_positions[action_id]
+            return self.actions[position - 1] if position > 0 else None
         else:
             # action given does not exist in task's actions
             raise ValueError('Action %s does not exist in Task %s' % (action_id, self.id))
@@ -162,17 +245,12 @@ class Task:
         returns None if action given is the last action
         raises error if action wan not in task
         """
-        action_found = True if action_id is None else False
-        for action in self.actions:
-            if action.id == action_id:
-                # return next action
-                action_found = True
-            elif action_found:
-                # return this action
-                return action
-        if action_found:
-            # action given was the last action
-            return None
+        if action_id is None:
+            return self.actions[0] if self.actions else None
+        elif action_id in self.actions_positions:
+            position = self.actions_positions[action_id]
+            # None if action given was the last action
+            return self.actions[position + 1] if position + 1 < len(self.actions) else None
         else:
             # action given does not exist in task's actions
             raise ValueError('Action %s does not exist in Task %s' % (action_id, self.id))
@@ -181,8 +259,10 @@ class Task:
 class Action:
 
     id = None
+    task_id = None
     name = None
-    constraints = None
+    constraints = None      # list of (task_id, action_id) of constraining actions
+    constraints_init = None # tuple of all constraints of action (restored on reset)
 
     status = None           # inqueue / inwaiting / inprogress / completed
     """
@@ -201,10 +281,22 @@ class Action:
 
     logger = None
 
-    def __init__(self, action_id, action_name, action_constraints, logger):
+    def __init__(self, task_id, action_id, action_name, action_constraints, logger):
         self.id = action_id
+        self.task_id = task_id
         self.name = action_name
         self.constraints = action_constraints
+        self.constraints_init = tuple(action_constraints)
+        self.logger = logger
+
+    def reset(self, logger):
+        """
+        restore action to its initial state
+        """
+        self.status = None
+        self.assigned_to = None
+        self.__act_time_left = None
+        self.constraints = list(self.constraints_init)
         self.logger = logger
 
     def assignment(self, agent):
@@ -217,16 +309,19 @@ class Action:
         else:
             raise ValueError('Cannot assign action %i with status `%s`' % (self.id, self.status))
 
-    def setup(self, fuzzy_time):
+    def setup(self, fuzzy_time, act_time=None):
         """
         called when an agent starts working on this action
+        act_time :: time needed for action, as drawn by the agent's sampler / None
         """
         if self.status == 'inwaiting' and not self.constraints:
             self.status = 'inprogress'
-            # get rv from trapezoidal distribution (issue with cereal scenario)
-            # self.__act_time_left = fuzzy_time.get_random_value()
-            # get rv from uniform distribution
-            self.__act_time_left = randint(fuzzy_time.value[1], fuzzy_time.value[2])
+            if act_time is not None:
+                # rv from trapezoidal distribution, drawn in batches by the agent's sampler
+                self.__act_time_left = act_time
+            else:
+                # get rv from uniform distribution
+                self.__act_time_left = randint(fuzzy_time.value[1], fuzzy_time.value[2])
         else:
             raise ValueError('Cannot start action %i with status `%s`' % (self.id, self.status))
 
@@ -241,27 +336,55 @@ class Action:
                 self.status = 'completed'
                 self.assigned_to = None
                 self.__act_time_left = None
-                self.logger.action_completed(self.id)
+                self.logger.action_completed(self.task_id, self.id)
                 return True
             else:
                 return False
         else:
             raise ValueError('Cannot progress action %i with status `%s`' % (self.id, self.status))
 
+    def get_steps_left(self, timestep):
+        """
+        Returns number of progress steps needed for action to be completed
+        """
+        if self.status == 'inprogress':
+            return max(ceil(self.__act_time_left / timestep), 1)
+        else:
+            raise ValueError('Cannot get steps left for action %i with status `%s`' % (self.id, self.status))
+
+    def skip(self, timestep, num_of_steps):
+        """
+        progress action by a number of steps in one go
+        steps skipped should not complete the action
+        """
+        if self.status == 'inprogress' and num_of_steps < self.get_steps_left(timestep):
+            self.__act_time_left -= timestep * num_of_steps
+        else:
+            raise ValueError('Cannot skip %s steps of action %i with status `%s`'
+                             % (num_of_steps, self.id, self.status))
+
     def update(self, behavior):
 
         # check if any constraints are met and remove them
         if self.constraints:
             to_remove = []
             for constraint in self.constraints:
-                constraining_task_id, constraining_action_id = map(int, constraint.split('-'))
+                constraining_task_id, constraining_action_id = constraint
                 if behavior[constraining_task_id][constraining_action_id].status == 'completed':
                     # constraint met - mark it to be removed
                     to_remove.append(constraint)
 
             # remove obsolete constraints
             for item in to_remove:
-                self.constraints.remove(item)
+                self.remove_constraint(item)
+
+    def remove_constraint(self, constraint):
+        """
+        called when constraining action (task_id, action_id) has been completed
+        """
+        self.constraints.remove(constraint)
+        if not self.constraints:
+            self.logger.action_available(self.task_id, self.id)
 
 
 class Team:
@@ -269,27 +392,45 @@ class Team:
     id = None
     name = None
     agents = []
+    agents_index = None     # {agent_id: Agent}
 
     status = None           # rest / work
     current_behavior = None
 
     planner = None
+    score_tables = None     # ScoreTables of the scenario, kept between trials (built by the planner if None)
 
     logger = None
     reporter = None
 
-    def __init__(self, team_specs, planner_type, logger, reporter):
+    def __init__(self, team_specs, planner_type, logger, reporter, sampler=None):
 
         agents = []
         for agent_specs in team_specs['agents_specs']:
-            agents.append(Agent(agent_specs['id'], agent_specs['name'], agent_specs['skills'], logger, reporter))
+            agents.append(Agent(agent_specs['id'], agent_specs['name'], agent_specs['skills'], logger, reporter,
+                                sampler))
 
         self.id = team_specs['id']
         self.name = team_specs['name']
         self.agents = agents
+        self.agents_index = {}
+        for agent in agents:
+            self.agents_index.setdefault(agent.id, agent)
+        self.status = 'rest'
+        self.logger = logger
+        self.reporter = reporter
+        self.planner = Planner(planner_type, self)
+
+    def reset(self, planner_type, logger, reporter, sampler=None):
+        """
+        restore team & agents to their initial state, for a new trial with the given planner
+        """
         self.status = 'rest'
+        self.current_behavior = None
         self.logger = logger
         self.reporter = reporter
+        for agent in self.agents:
+            agent.reset(logger, reporter, sampler)
         self.planner = Planner(planner_type, self)
 
     def assign_behavior(self, behavior):
@@ -321,25 +462,55 @@ class Team:
         self.assign_tasks_to_agents()
 
         # make progress
+        actions_completed = []
         for agent in self.agents:
-            agent.progress(timestep)
+            action_completed = agent.progress(timestep)
+            if action_completed is not None:
+                actions_completed.append(action_completed)
 
         # update behavior / tasks / actions statuses
-        self.current_behavior.update()
-
-        # check if behavior completed [functional but not needed]
-        # if self.current_behavior.status == 'completed':
-        #     self.current_behavior = None
-        #     self.status = 'rest'
-
-        # # check if all agents are waiting at still constrained tasks
-        # # NOTE: functional code but not necessary since time limit exists
-        # elif (all([True if agent.status == 'wait' and agent.current_action.status == 'constrained'
-        #            else False for agent in self.agents])):
-        #     # progress blocked - behavior failed
-        #     self.current_behavior.status = 'failed'
-        #     self.current_behavior = None
-        #     self.status = 'rest'
+        self.current_behavior.update(actions_completed)
+
+        # check if progress blocked - behavior failed (instead of waiting until the time limit)
+        if self.current_behavior.status == 'inprogress' and self.is_blocked():
+            self.current_behavior.status = 'failed'
+            self.logger.behavior_failed(self.current_behavior.id)
+
+    def is_blocked(self):
+        """
+        Returns if no agent / task / action can ever change status
+        (no agent working or able to start working, and no planning round due)
+        e.g. every agent waiting for constraints of tasks no agent is left to work on
+        """
+        for agent in self.agents:
+            if agent.status == 'work' or (agent.status == 'wait' and not agent.current_action.constraints):
+                return False
+        return not (self.get_agents(status_filter='rest')
+                    and self.current_behavior.get_tasks_ids(status_filter='available'))
+
+    def get_steps_to_next_event(self, timestep):
+        """
+        Returns number of steps that can pass before any agent / task / action changes status
+        0 if a change can happen in the next step, None if no change can ever happen
+        """
+        # a planning round is due
+        if self.get_agents(status_filter='rest') and self.current_behavior.get_tasks_ids(status_filter='available'):
+            return 0
+
+        steps = None
+        for agent in self.agents:
+            agent_steps = agent.get_steps_to_next_event(timestep)
+            if agent_steps is not None and (steps is None or agent_steps < steps):
+                steps = agent_steps
+        return steps
+
+    def skip(self, timestep, num_of_steps):
+        """
+        make progress for a number of steps in which no status changes
+        (see get_steps_to_next_event)
+        """
+        for agent in self.agents:
+            agent.skip(timestep, num_of_steps)
 
     def __getitem__(self, key):
         return self.get_agent_by_id(key)
@@ -349,11 +520,7 @@ class Team:
         Get agent by id
         Returns Agent / None
         """
-        for agent in self.agents:
-            if agent.id == agent_id:
-                return agent
-        else:
-            return None
+        return self.agents_index.get(agent_id)
 
     def get_agents(self, status_filter=None):
         """
@@ -378,12 +545,29 @@ class Agent:
     current_action = None           # Action
     exp_time_left_action = None     # Fuzzy or None (None when agent waiting or no current task/action assignment)
 
+    sampler = None                  # TrapezoidalSampler for actions' times / None for uniformly distributed times
+
     logger = None
     reporter = None
 
-    def __init__(self, agent_id, agent_name, agent_skills, logger, reporter):
+    def __init__(self, agent_id, agent_name, agent_skills, logger, reporter, sampler=None):
         self.id = agent_id
         self.name = agent_name
+        self.skills = self.prepare_skills(agent_skills)
+        self.status = 'rest'
+        self.sampler = sampler
+        self.logger = logger
+        self.reporter = reporter
+
+    @staticmethod
+    def prepare_skills(agent_skills):
+        """
+        completes agent's skills given in specs (in place)
+        returns {action_id: {'t': Fuzzy, 'r': robustness, 'e': error}}
+        skills of a SkillTable (large scenarios) are already complete, so they are returned as they are
+        """
+        if isinstance(agent_skills, AgentSkills):
+            return agent_skills
 
         # add robustness/error level where needed in agent's skills
         # robustness = 10 - error
@@ -399,8 +583,17 @@ class Agent:
         for action_id in agent_skills.keys():
             agent_skills[action_id]['t'] = fl.Fuzzy(agent_skills[action_id]['t'])
 
-        self.skills = agent_skills
+        return agent_skills
+
+    def reset(self, logger, reporter, sampler=None):
+        """
+        restore agent to her initial state (skills are kept as they are)
+        """
         self.status = 'rest'
+        self.current_task = None
+        self.current_action = None
+        self.exp_time_left_action = None
+        self.sampler = sampler
         self.logger = logger
         self.reporter = reporter
 
@@ -437,10 +630,7 @@ class Agent:
 
             else:
                 # start working
-                self.status = 'work'
-                self.exp_time_left_action = self.skills[self.current_action.id]['t']
-                self.current_action.setup(self.skills[self.current_action.id]['t'])
-                self.logger.agent_started_working(self.id, self.current_task.id, self.current_action.id)
+                self.start_working()
 
         else:
             # if no next action exists, put agent to rest
@@ -450,24 +640,36 @@ class Agent:
             self.exp_time_left_action = None
             self.logger.agent_at_rest(self.id)
 
+    def start_working(self):
+        """
+        Called by agent to start working on current action, once it is unconstrained
+        """
+        fuzzy_time = self.skills[self.current_action.id]['t']
+        self.status = 'work'
+        self.exp_time_left_action = fuzzy_time
+        act_time = self.sampler.sample((self.id, self.current_action.id), fuzzy_time) if self.sampler else None
+        self.current_action.setup(fuzzy_time, act_time)
+        self.logger.agent_started_working(self.id, self.current_task.id, self.current_action.id)
+
     def progress(self, timestep):
+        """
+        Returns Action completed during this step / None
+        """
+        action_completed = None
 
         # if waiting, check if no need to wait any longer
         if self.status == 'wait' and not self.current_action.constraints:
             # start working
-            self.status = 'work'
-            self.exp_time_left_action = self.skills[self.current_action.id]['t']
-            self.current_action.setup(self.skills[self.current_action.id]['t'])
-            self.logger.agent_started_working(self.id, self.current_task.id, self.current_action.id)
+            self.start_working()
 
         # if working, progress current action
         if self.status == 'work':
             # report agent working
             self.reporter.report_agent_status(self.id, self.status)
             # make progress on current action
-            action_completed = self.current_action.progress(timestep)
             # check if action completed
-            if action_completed:
+            if self.current_action.progress(timestep):
+                action_completed = self.current_action
                 # self-assign to next action of task / put at rest if no next action exists
                 self.self_assign_action()
             else:
@@ -478,7 +680,37 @@ class Agent:
         elif self.status in ['rest', 'wait']:
             # report agent resting/waiting/
             self.reporter.report_agent_status(self.id, self.status)
-            pass
+
+        else:
+            raise ValueError('Why you %s-ing?' % self.status)
+
+        return action_completed
+
+    def get_steps_to_next_event(self, timestep):
+        """
+        Returns number of steps that can pass before agent changes status on her own
+        0 if a change can happen in the next step, None if agent depends on others to change status
+        """
+        if self.status == 'work':
+            return self.current_action.get_steps_left(timestep) - 1
+        elif self.status == 'wait':
+            return None if self.current_action.constraints else 0
+        elif self.status == 'rest':
+            return None
+        else:
+            raise ValueError('Why you %s-ing?' % self.status)
+
+    def skip(self, timestep, num_of_steps):
+        """
+        same as calling progress num_of_steps times, when agent's status does not change in between
+        """
+        if self.status == 'work':
+            self.reporter.report_agent_status(self.id, self.status, num_of_steps)
+            self.current_action.skip(timestep, num_of_steps)
+            self.exp_time_left_action = self.exp_time_left_action.roll_left(timestep * num_of_steps)
+
+        elif self.status in ['rest', 'wait']:
+            self.reporter.report_agent_status(self.id, self.status, num_of_steps)
 
         else:
             raise ValueError('Why you %s-ing?' % self.status)
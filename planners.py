@@ -1,7 +1,13 @@
 
 from helpers import *
+from behavior_graph import BehaviorGraph
+from score_tables import ScoreTables
+import mcts
 
-from random import shuffle
+from random import Random, shuffle
+from scipy.optimize import linear_sum_assignment
+from time import perf_counter
+import numpy as np
 
 
 class Planner:
@@ -16,6 +22,19 @@ class Planner:
 
     team_benefit_scores = None      # daisy_planner_v2 persistent data
 
+    horizon = None                  # beam_planner num of assignments planned ahead (after resting agents' ones)
+    beam_width = None               # beam_planner num of partial plans kept at every step of the search
+    max_nodes = None                # beam_planner search budget - num of plans evaluated per call
+    max_latency = None              # beam_planner search budget - time (sec) per call / 0 for no time limit
+    search_stats = None             # beam_planner / mcts_planner (nodes explored, latency in sec) of every call
+
+    budget = None                   # mcts_planner wall-clock time (sec) per call / 0 for no time limit
+    max_rollouts = None             # mcts_planner num of rollouts per call / 0 for no limit
+    num_of_workers = None           # mcts_planner num of processes running searches in parallel
+    rng = None                      # mcts_planner private random.Random for seeding searches
+
+    behavior_graph = None           # BehaviorGraph of the team's behavior (built once needed)
+
     def __init__(self, planner_algorithm, team):
 
         self.team = team
@@ -23,8 +42,11 @@ class Planner:
         self.m = None
         self.max_vanilla_scores = None
         self.team_benefit_scores = None
+        self.search_stats = []
 
-        # base / base+ / dpv1 / dpv2 / new-0.0 / new-0.5 / new-1.0
+        # base / base+ / dpv1 / dpv2 / new-0.0 / new-0.5 / new-1.0 / new+-0.0 / new+-0.5 / new+-1.0
+        # beam-<horizon>[-<beam_width>[-<max_nodes>[-<max_latency_ms>]]] (e.g. beam-4 / beam-4-8-5000-100)
+        # mcts-<budget_ms>[-<num_of_workers>[-<max_rollouts>]] (e.g. mcts-50 / mcts-200-4 / mcts-0-1-2000)
         if planner_algorithm == 'base':
             self.selected_planner = self.basic_planner
         elif planner_algorithm == 'base+':
@@ -36,6 +58,28 @@ class Planner:
         elif planner_algorithm.split('-')[0] == 'new':
             self.selected_planner = self.new_planner
             self.m = float(planner_algorithm.split('-')[1])
+        elif planner_algorithm.split('-')[0] == 'new+':
+            self.selected_planner = self.new_optimal_planner
+            self.m = float(planner_algorithm.split('-')[1])
+        elif planner_algorithm.split('-')[0] == 'beam':
+            self.selected_planner = self.beam_planner
+            params = [int(param) for param in planner_algorithm.split('-')[1:]]
+            params += [4, 2000, 0][len(params) - 1:]
+            if len(params) != 4 or min(params) < 0 or params[1] < 1:
+                raise ValueError('Invalid beam planner: `%s`' % planner_algorithm)
+            self.horizon, self.beam_width, self.max_nodes = params[:3]
+            self.max_latency = params[3] / 1000
+        elif planner_algorithm.split('-')[0] == 'mcts':
+            self.selected_planner = self.mcts_planner
+            params = [int(param) for param in planner_algorithm.split('-')[1:]]
+            params += [1, 0][len(params) - 1:]
+            # a search needs a budget of time or rollouts (or both, the first one exhausted stops it)
+            if len(params) != 3 or min(params) < 0 or params[1] < 1 or params[0] == params[2] == 0:
+                raise ValueError('Invalid mcts planner: `%s`' % planner_algorithm)
+            self.budget = params[0] / 1000
+            self.num_of_workers, self.max_rollouts = params[1:]
+            # searches never draw from the module rng, which drives the simulation itself
+            self.rng = Random(planner_algorithm)
         else:
             raise ValueError('Unknown planner_algorithm: `%s`' % planner_algorithm)
 
@@ -43,6 +87,24 @@ class Planner:
 
         return self.selected_planner()
 
+    def get_score_tables(self):
+        """
+        returns the static score tables of the team's scenario (shared by all trials run on it)
+        """
+        if self.team.score_tables is None:
+            self.team.score_tables = ScoreTables()
+        return self.team.score_tables.build(self.team.get_agents(), self.team.current_behavior.tasks)
+
+    def get_behavior_graph(self):
+        """
+        returns the dependency graph of the team's behavior, updated for the actions completed so far
+        (an API for new planners only, not used by the planners below)
+        """
+        if self.behavior_graph is None:
+            self.behavior_graph = BehaviorGraph(self.team.current_behavior.tasks, self.team.get_agents())
+        self.behavior_graph.sync(self.team.current_behavior)
+        return self.behavior_graph
+
     """
     All planners take as input the current state of the team (including the working behavior) from self.team
     and return a dictionary of assignments in the form of {agent_id : task_id}
@@ -58,16 +120,12 @@ class Planner:
         # get task ids from available tasks and split them into constrained and not constrained ones
         tasks_unconstrained = []
         tasks_constrained = []
-        for task in self.team.current_behavior.tasks:
-            if task.status == 'available':
-                # check if any action of task is constrained
-                # throw task id into the corresponding list
-                for action in task.actions:
-                    if action.constraints:
-                        tasks_constrained.append(task.id)
-                        break
-                else:
-                    tasks_unconstrained.append(task.id)
+        for task_id, constrained in self.team.current_behavior.get_tasks_constrained(status_filter='available').items():
+            # throw task id into the corresponding list
+            if constrained:
+                tasks_constrained.append(task_id)
+            else:
+                tasks_unconstrained.append(task_id)
 
         shuffle(tasks_constrained)
         shuffle(tasks_unconstrained)
@@ -156,16 +214,12 @@ class Planner:
             elif len(tasks_considered) == 1:
                 task_selected = tasks_considered[0]
             else:
-                # calculate assignment costs for tasks under consideration
+                # get assignment costs (total time / (1 + min robustness)) for tasks under consideration
+                score_tables = self.get_score_tables()
+                agent_costs = score_tables.dpv1_costs[score_tables.agents_index[resting_agent.id]]
                 ac_scores = {}
                 for task_id in tasks_considered:
-                    actions_list = self.team.current_behavior[task_id].get_actions_ids()
-                    # get total time
-                    tt = resting_agent.calc_actions_tt(actions_list)
-                    # get minimum robustness
-                    mr = resting_agent.calc_actions_mr(actions_list)
-                    # calculate assignment cost
-                    ac_scores[task_id] = tt.defuzzify() / (1 + mr)
+                    ac_scores[task_id] = agent_costs[score_tables.tasks_index[task_id]]
                 # select task with minimum assignment cost
                 task_selected = min(ac_scores, key=ac_scores.get)
 
@@ -184,36 +238,9 @@ class Planner:
         chooses between available options based on team benefit
         """
 
-        # calc team_benefit_scores the first time the planner runs
+        # get team_benefit_scores the first time the planner runs
         if self.team_benefit_scores is None:
-
-            # tasks' ids & agents
-            tasks_ids = self.team.current_behavior.get_tasks_ids()
-            agents_all = self.team.get_agents()
-
-            # assignment costs
-            ac = {agent.id: {task_id: None for task_id in tasks_ids} for agent in agents_all}
-
-            for agent in agents_all:
-                for task_id in tasks_ids:
-                    total_time = agent.calc_actions_tt(self.team.current_behavior[task_id].get_actions_ids())
-                    max_error = agent.calc_actions_me(self.team.current_behavior[task_id].get_actions_ids())
-                    ac[agent.id][task_id] = total_time * max_error
-
-            # team benefit scores
-            tb = {agent.id: {task_id: None for task_id in tasks_ids} for agent in agents_all}
-
-            for task_id in tasks_ids:
-                for agent in agents_all:
-                    ac_diffs = []
-                    for other_agent in agents_all:
-                        if agent.id != other_agent.id:
-                            fuzzy_diff = ac[other_agent.id][task_id] - ac[agent.id][task_id]
-                            ac_diffs.append(fuzzy_diff.defuzzify())
-                    tb[agent.id][task_id] = max(ac_diffs) if ac_diffs else 1
-
-            # save the team benefit scores for later reference
-            self.team_benefit_scores = tb
+            self.team_benefit_scores = self.get_score_tables().get_team_benefit_scores()
             self.logger.planner_dpv2_benefit_table(self.team_benefit_scores)
 
         assignments = {}
@@ -254,41 +281,17 @@ class Planner:
         self.logger.planner_assignments(assignments)
         return assignments
 
-    def new_planner(self):
-
-        # calc max_vanilla_scores the first time the planner runs
-        if self.max_vanilla_scores is None:
-            """
-            vanilla scores do not consider:
-            - constraints between tasks
-            - expected times for agent to be available for assignment
-            they exist so that a theoretical maximum value score for each task can be calculated
-            in order to normalize the actual scores later
-            """
+    def calc_new_values(self):
+        """
+        calculates the relative value of every possible assignment of an available task to an agent
+        returns dict of relative values in the form of {agent_id : {task_id : value}}
+        """
 
-            # calc vanilla scores for each task theoretically assigned to each agent
-            vanilla_scores = {agent.id: {task.id: None for task in self.team.current_behavior.tasks}
-                              for agent in self.team.agents}
-            for agent in self.team.agents:
-                for task in self.team.current_behavior.tasks:
-                    actions_list = self.team.current_behavior[task.id].get_actions_ids()
-
-                    tt = self.team[agent.id].calc_actions_tt(actions_list)
-                    mr = self.team[agent.id].calc_actions_mr(actions_list)
-                    vs = mr ** self.m / tt.defuzzify() ** (1-self.m)
-                    vanilla_scores[agent.id][task.id] = vs
-
-            # get the maximum vanilla score each task can achieved if assigned to the most appropriate agent
-            max_vanilla_scores = {}
-            for task in self.team.current_behavior.tasks:
-                max_score = 0
-                for agent in self.team.agents:
-                    if vanilla_scores[agent.id][task.id] > max_score:
-                        max_score = vanilla_scores[agent.id][task.id]
-                max_vanilla_scores[task.id] = max_score
+        score_tables = self.get_score_tables()
 
-            # save the max vanilla scores for later reference
-            self.max_vanilla_scores = max_vanilla_scores
+        # get max_vanilla_scores the first time the planner runs
+        if self.max_vanilla_scores is None:
+            self.max_vanilla_scores = score_tables.get_max_vanilla_scores(self.m)
             self.logger.planner_new_vanilla_table(self.max_vanilla_scores)
 
         # init values table
@@ -296,13 +299,17 @@ class Planner:
                              for task_id in self.team.current_behavior.get_tasks_ids(status_filter='available')}
                   for agent in self.team.agents}
 
+        # expected times of actions are shared by all assignments evaluated in this planning round
+        exp_times_memo = {}
+
         # calculate values for each possible assignment of task to agent
         for agent in self.team.agents:
             for task_id in self.team.current_behavior.get_tasks_ids(status_filter='available'):
                 # get expected time to complete task
-                tt = calc_exp_time_to_complete_next_task(self.team, agent, self.team.current_behavior[task_id])
+                tt = calc_exp_time_to_complete_next_task(self.team, agent, self.team.current_behavior[task_id],
+                                                         exp_times_memo)
                 # get expected robustness level
-                mr = agent.calc_actions_mr(self.team.current_behavior[task_id].get_actions_ids())
+                mr = score_tables.mr[score_tables.agents_index[agent.id], score_tables.tasks_index[task_id]].item()
                 # calculate absolute value of assignment
                 av = mr ** self.m / tt.defuzzify() ** (1-self.m) if tt else None
                 # calculate value of assignment relative to max vanilla scores
@@ -310,6 +317,11 @@ class Planner:
                 values[agent.id][task_id] = rv
 
         self.logger.planner_new_values_table(values)
+        return values
+
+    def new_planner(self):
+
+        values = self.calc_new_values()
 
         assignments = {}
         for resting_agent in self.team.get_agents(status_filter='rest'):
@@ -324,3 +336,219 @@ class Planner:
 
         self.logger.planner_assignments(assignments)
         return assignments
+
+    def new_optimal_planner(self):
+        """
+        same values as new_planner, but instead of selecting the best task for each resting agent in turn,
+        the combination of assignments with the maximum sum of relative values is selected at once,
+        by solving the (rectangular) linear sum assignment problem of resting agents x available tasks
+        """
+
+        values = self.calc_new_values()
+
+        resting_agents = self.team.get_agents(status_filter='rest')
+        tasks_ids = self.team.current_behavior.get_tasks_ids(status_filter='available')
+        values_table = np.array([[values[agent.id][task_id] for task_id in tasks_ids] for agent in resting_agents],
+                                dtype=float).reshape(len(resting_agents), len(tasks_ids))
+
+        # more agents resting than tasks available leaves some agents without assignment
+        assignments = {agent.id: None for agent in resting_agents}
+        for agent_index, task_index in zip(*linear_sum_assignment(-values_table)):
+            assignments[resting_agents[agent_index].id] = tasks_ids[task_index]
+
+        self.logger.planner_assignments(assignments)
+        return assignments
+
+    def beam_planner(self):
+        """
+        plans ahead the assignments of resting agents followed by the next `horizon` assignments of the team,
+        as agents are expected to become available, by a beam search over sequences of assignments
+        sequences are evaluated by the expected makespan of the schedule they produce, based on the expected times
+        of agents to complete their current tasks & of constraints to be met, calculated as by new_planner
+        only the assignments of resting agents (first steps of the best sequence found) are returned,
+        the rest of the plan is revised at the next planning rounds
+        the search stops when its budget (nodes / time) is exhausted, completing the best plan found so far greedily
+        """
+        start = perf_counter()
+        team = self.team
+        behavior = team.current_behavior
+        score_tables = self.get_score_tables()
+        exp_times_memo = {}
+
+        agents = team.get_agents()
+        resting_agents = [agent_index for agent_index, agent in enumerate(agents) if agent.status == 'rest']
+        tasks_available = [behavior[task_id] for task_id in behavior.get_tasks_ids(status_filter='available')]
+
+        # ----- expected times (defuzzified) for agents to be available -----
+        agents_free = []
+        for agent in agents:
+            time_to_complete = calc_exp_time_to_complete_current_task(team, agent, exp_times_memo)
+            if time_to_complete is not None:
+                agents_free.append(time_to_complete.defuzzify())
+            else:
+                # unpredictable (constraints of unassigned tasks) - assume the whole task is still ahead
+                agents_free.append(score_tables.tt_defuzzified[score_tables.agents_index[agent.id],
+                                                               score_tables.tasks_index[agent.current_task.id]].item())
+
+        # ----- expected times (defuzzified) for constraints of available tasks to be met -----
+        # {(task_id, action_id): time} for constraining actions of tasks already assigned, None if unpredictable
+        actions_end = {}
+        for task in tasks_available:
+            for action in task.actions:
+                for constraint in action.constraints:
+                    if constraint not in actions_end and behavior[constraint[0]].status != 'available':
+                        time_to_start, time_to_complete = \
+                            calc_exp_times_for_action(team, constraint[0], constraint[1], exp_times_memo)
+                        actions_end[constraint] = \
+                            (time_to_start + time_to_complete).defuzzify() if time_to_start is not None else None
+
+        # minimum time any agent needs for each task, for estimating the time of the work not planned yet
+        min_tt = score_tables.tt_defuzzified.min(axis=0).tolist()
+        tasks_min_tt = {task.id: min_tt[score_tables.tasks_index[task.id]] for task in tasks_available}
+
+        def expand(node):
+            """
+            returns the plans extending the plan of node by the next assignment
+            (for the next resting agent, or else for the agent expected to be available first)
+            """
+            depth = len(node.assignments)
+            if depth < len(resting_agents):
+                agent_index = resting_agents[depth]
+            else:
+                agent_index = min(range(len(agents)), key=node.agents_free.__getitem__)
+            agent = agents[agent_index]
+
+            children = []
+            for task in tasks_available:
+                if task.id not in node.tasks_left:
+                    continue
+                time = node.agents_free[agent_index]
+                penalty = node.penalty
+                planned_ends = []
+                for action in task.actions:
+                    for constraint in action.constraints:
+                        constraint_end = node.actions_end.get(constraint, actions_end.get(constraint))
+                        if constraint_end is None:
+                            # constraint of a task not planned / unpredictable - cannot estimate when it is met
+                            penalty += 1
+                        elif constraint_end > time:
+                            time = constraint_end
+                    time += agent.skills[action.id]['t'].defuzzify()
+                    planned_ends.append(((task.id, action.id), time))
+                children.append(PlanNode(node, agent_index, task.id, time, planned_ends, penalty,
+                                         tasks_min_tt[task.id]))
+
+            if not children and depth < len(resting_agents):
+                # more agents resting than tasks available
+                children.append(PlanNode(node, agent_index, None, node.agents_free[agent_index], [], node.penalty, 0))
+            return children
+
+        # ----- beam search -----
+        root = PlanNode.root(agents_free, tasks_min_tt)
+
+        nodes_explored = 0
+        budget_exhausted = False
+        beam = [root]
+        best = root
+        for _ in range(len(resting_agents) + self.horizon):
+            children = []
+            for node in beam:
+                node_children = expand(node)
+                children += node_children
+                nodes_explored += len(node_children)
+                if nodes_explored >= self.max_nodes or \
+                        (self.max_latency and perf_counter() - start >= self.max_latency):
+                    budget_exhausted = True
+                    break
+            if budget_exhausted or not children:
+                break
+            children.sort(key=PlanNode.get_score)
+            beam = children[:self.beam_width]
+            best = beam[0]
+
+        # ----- complete resting agents' assignments greedily (search budget exhausted) -----
+        while len(best.assignments) < len(resting_agents):
+            children = expand(best)
+            nodes_explored += len(children)
+            best = min(children, key=PlanNode.get_score)
+
+        assignments = {agents[agent_index].id: task_id
+                       for agent_index, task_id in best.assignments[:len(resting_agents)]}
+
+        self.search_stats.append((nodes_explored, perf_counter() - start))
+        self.logger.planner_search(*self.search_stats[-1])
+        self.logger.planner_assignments(assignments)
+        return assignments
+
+    def mcts_planner(self):
+        """
+        evaluates the assignments of available tasks to resting agents by Monte Carlo Tree Search,
+        playing out the remaining behavior with actions' times drawn from agents' skills (see mcts.py)
+        searches run for a wall-clock budget and / or a num of rollouts per call (only the latter is reproducible),
+        in num_of_workers processes whose results are merged
+        returns the assignments of the decisions most explored by the searches
+        """
+        start = perf_counter()
+
+        snapshot = mcts.get_snapshot(self.team)
+        seeds = [self.rng.getrandbits(32) for _ in range(self.num_of_workers)]
+        stats = mcts.parallel_search(snapshot, self.budget, self.max_rollouts, seeds, self.num_of_workers)
+        decisions = mcts.best_decisions(stats, snapshot)
+
+        assignments = dict(zip(snapshot['resting'], decisions))
+
+        self.search_stats.append((stats[()][0], perf_counter() - start))
+        self.logger.planner_search(*self.search_stats[-1])
+        self.logger.planner_assignments(assignments)
+        return assignments
+
+
+class PlanNode:
+    """
+    node of beam_planner's search - partial plan of assignments and the expected state of the team following it
+    """
+
+    __slots__ = ('assignments', 'agents_free', 'actions_end', 'tasks_left', 'work_left', 'penalty', 'score')
+
+    def __init__(self, parent, agent_index, task_id, agent_free, planned_ends, penalty, task_work):
+        """
+        extends the plan of parent by assigning task to agent, who is expected to be available again at agent_free
+        planned_ends :: list of ((task_id, action_id), expected time for action to be completed)
+        penalty :: num of constraints whose time to be met could not be estimated so far
+        """
+        self.assignments = parent.assignments + ((agent_index, task_id), )
+        self.agents_free = list(parent.agents_free)
+        self.agents_free[agent_index] = agent_free
+        self.actions_end = {**parent.actions_end, **dict(planned_ends)} if planned_ends else parent.actions_end
+        self.tasks_left = parent.tasks_left - {task_id}
+        self.work_left = parent.work_left - task_work
+        self.penalty = penalty
+        self.score = self.evaluate()
+
+    @classmethod
+    def root(cls, agents_free, tasks_work):
+        """
+        returns the empty plan
+        agents_free :: list of expected times for agents to be available
+        tasks_work :: {task_id: min time needed for task} for tasks to be planned
+        """
+        node = cls.__new__(cls)
+        node.assignments = ()
+        node.agents_free = agents_free
+        node.actions_end = {}
+        node.tasks_left = frozenset(tasks_work)
+        node.work_left = sum(tasks_work.values())
+        node.penalty = 0
+        node.score = node.evaluate()
+        return node
+
+    def evaluate(self):
+        """
+        returns (penalty, expected makespan, total time of agents) of plan, lower is better
+        expected makespan is bounded by the agent available last, and by all work left being shared evenly
+        """
+        total = sum(self.agents_free)
+        return self.penalty, max(max(self.agents_free), (total + self.work_left) / len(self.agents_free)), total
+
+    def get_score(self):
+        return self.score
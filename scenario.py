@@ -1,4 +1,12 @@
 
+from behavior_graph import BehaviorGraph
+from score_tables import ScoreTables
+from skill_table import SkillTable, AgentSkills
+
+from collections import OrderedDict
+import os
+import numpy as np
+import pickle
 import random
 
 
@@ -11,9 +19,11 @@ class Scenario:
     behavior_specs = None
     team_specs = None
     time_max = None
+    score_tables = None     # ScoreTables shared by the simulations of the scenario (and of its copies)
 
     def __init__(self, scenario_type, scenario_id):
 
+        self.score_tables = ScoreTables()
         self.scenario_type = scenario_type
         self.scenario_id = None if self.scenario_type in ['salad', 'cereal'] else scenario_id
 
@@ -37,12 +47,68 @@ class Scenario:
                     num_of_tasks=int(sn_params[2]))
                 self.time_max = self.calc_no_concurrency_worst_time(self.behavior_specs, self.team_specs)
 
+            elif len(sn_params) == 3 and sn_params[0] == 'large':
+                # return a randomly generated scenario, with skills kept in a SkillTable
+                self.actions_names, self.behavior_specs, self.team_specs = self.large(
+                    scenario_id=scenario_id,
+                    num_of_agents=int(sn_params[1]),
+                    num_of_tasks=int(sn_params[2]))
+                self.time_max = self.calc_no_concurrency_worst_time(self.behavior_specs, self.team_specs)
+
             else:
                 raise ValueError('Invalid scenario_type: `%s`' % scenario_type)
 
+        # ----- validate behavior -----
+        # actions waiting on cyclic constraints would never be started (raises ValueError)
+        BehaviorGraph.from_specs(self.behavior_specs)
+
     def __call__(self):
         return self.actions_names, self.behavior_specs, self.team_specs, self.time_max
 
+    def copy(self):
+        """
+        returns a copy of the scenario with specs that can be modified without affecting the ones of this scenario
+        (e.g. agents' skills are modified in place by Agent.__init__)
+        actions' names are never modified, so they are shared (as are the score tables built for the scenario)
+        """
+        scenario = Scenario.__new__(Scenario)
+        scenario.scenario_type = self.scenario_type
+        scenario.scenario_id = self.scenario_id
+        scenario.actions_names = self.actions_names
+        scenario.time_max = self.time_max
+        # scenarios saved to a library before score tables existed have none
+        if self.score_tables is None:
+            self.score_tables = ScoreTables()
+        scenario.score_tables = self.score_tables
+
+        scenario.behavior_specs = {
+            **self.behavior_specs,
+            'tasks_specs': [
+                {
+                    **task_specs,
+                    'action_list': list(task_specs['action_list']),
+                    'constraints': {action_id: list(constraints)
+                                    for action_id, constraints in task_specs['constraints'].items()}
+                }
+                for task_specs in self.behavior_specs['tasks_specs']
+            ]
+        }
+
+        scenario.team_specs = {
+            **self.team_specs,
+            'agents_specs': [
+                {
+                    **agent_specs,
+                    # skills of a SkillTable are never modified, so they are shared
+                    'skills': agent_specs['skills'] if isinstance(agent_specs['skills'], AgentSkills) else
+                    {action_id: dict(skill_stats) for action_id, skill_stats in agent_specs['skills'].items()}
+                }
+                for agent_specs in self.team_specs['agents_specs']
+            ]
+        }
+
+        return scenario
+
     # -------------------- #
 
     @staticmethod
@@ -348,6 +414,112 @@ class Scenario:
 
     # -------------------- #
 
+    @staticmethod
+    def large(scenario_id, num_of_agents=1000, num_of_tasks=10000):
+        """
+        generates a scenario like custom, for teams & behaviors of any size
+        - actions' ids are not limited to 4 digits (regular actions from 1000, followed by special ones)
+        - random values are drawn in bulk from a numpy Generator seeded by scenario_id (never from random)
+        - tasks are looked up by their position, instead of searching the tasks generated so far
+        - agents' skills are kept in a SkillTable (agents x actions arrays) instead of a dict per agent & action
+        """
+
+        if not (isinstance(num_of_agents, int) and isinstance(num_of_tasks, int)
+                and num_of_agents > 0 and num_of_tasks > 0):
+            raise ValueError('Invalid scenario settings')
+
+        rng = np.random.default_rng(scenario_id)
+
+        # ----- Actions -----
+        num_of_regular_actions = num_of_tasks * 3
+        actions_ids = np.arange(1000, 1000 + num_of_tasks * 4)
+        actions_names = {action_id: 'Action#%s' % action_id for action_id in actions_ids.tolist()}
+        actions_times = rng.integers(5, 16, len(actions_ids), dtype=np.int16)    # basic duration for action
+
+        # ----- Agents & Skills -----
+        # drawn for chunks of agents at once, with exact integer arithmetic (range modifiers in tenths)
+        times = np.empty((num_of_agents, len(actions_ids), 2), dtype=np.uint8)
+        robustness = np.empty((num_of_agents, len(actions_ids)), dtype=np.int8)
+        chunk_size = max(2 ** 20 // len(actions_ids), 1)
+        for first in range(0, num_of_agents, chunk_size):
+            shape = (min(chunk_size, num_of_agents - first), len(actions_ids))
+            range_modifiers = rng.integers(1, 5, shape, dtype=np.int16)
+            extra_modifiers = rng.integers(0, 4, shape, dtype=np.int16)
+            times[first:first + shape[0], :, 0] = actions_times * (10 - range_modifiers) // 10 + extra_modifiers
+            times[first:first + shape[0], :, 1] = actions_times * (10 + range_modifiers) // 10 + extra_modifiers
+            # half of the regular actions are always robust, special actions are less robust the longer they take
+            chunk_robustness = robustness[first:first + shape[0]]
+            chunk_robustness[:, :num_of_regular_actions] = \
+                9 - 2 * rng.integers(0, 2, (shape[0], num_of_regular_actions), dtype=np.int8)
+            chunk_robustness[:, :num_of_regular_actions // 2] = 9
+            chunk_robustness[:, num_of_regular_actions:] = 9 - extra_modifiers[:, num_of_regular_actions:]
+        skill_table = SkillTable(actions_ids, times, robustness)
+
+        agents_specs = [{'id': i, 'name': 'Agent#%s' % i, 'skills': skill_table.get_agent_skills(i)}
+                        for i in range(num_of_agents)]
+
+        # ----- Team -----
+        team_specs = {
+            'id': 0,
+            'name': 'Team#%s' % 0,
+            'agents_specs': agents_specs
+        }
+
+        # ----- Tasks & Constraints -----
+        regular_actions_ids = actions_ids[:num_of_regular_actions].tolist()
+        special_actions_ids = actions_ids[num_of_regular_actions:].tolist()
+        actions_nums = np.minimum(rng.integers(3, 7, num_of_tasks), num_of_regular_actions).tolist()
+        actions_picks = rng.integers(0, num_of_regular_actions, (num_of_tasks, 6)).tolist()
+        special_picks = rng.integers(0, num_of_tasks, num_of_tasks).tolist()
+        actions_orders = np.argsort(rng.random((num_of_tasks, 7)), axis=1).tolist()
+        constrained_picks = rng.random(num_of_tasks).tolist()
+        constraints_nums = np.minimum(rng.choice([0, 0, 1, 3, 5], num_of_tasks), np.arange(num_of_tasks)).tolist()
+        constraining_picks = rng.random((num_of_tasks, 5)).tolist()
+        constraining_actions_picks = rng.random((num_of_tasks, 5)).tolist()
+
+        tasks_specs = []
+        for position in range(num_of_tasks):
+
+            # constraints on actions of distinct previous tasks (looked up by position)
+            constraints_num = constraints_nums[position]
+            constraining_tasks = [int(pick * position) for pick in constraining_picks[position][:constraints_num]]
+            if len(set(constraining_tasks)) < constraints_num:
+                constraining_tasks = rng.choice(position, constraints_num, replace=False).tolist()
+            constraints = []
+            for constraining_task, pick in zip(constraining_tasks, constraining_actions_picks[position]):
+                t_actions = tasks_specs[constraining_task]['action_list']
+                constraints.append('%s-%s' % (tasks_specs[constraining_task]['id'], t_actions[int(pick * len(t_actions))]))
+
+            # distinct regular actions & a special action, in random order
+            actions_num = actions_nums[position]
+            picks = actions_picks[position][:actions_num]
+            if len(set(picks)) < actions_num:
+                picks = rng.choice(num_of_regular_actions, actions_num, replace=False).tolist()
+            action_list = [regular_actions_ids[pick] for pick in picks] + [special_actions_ids[special_picks[position]]]
+            action_list = [action_list[index] for index in actions_orders[position] if index < len(action_list)]
+
+            task_id = 101 + position
+            task_spec = {
+                'id': task_id,
+                'name': 'Task#%s' % task_id,
+                'action_list': action_list,
+                'constraints': {action_list[int(constrained_picks[position] * len(action_list))]: constraints}
+                if constraints else {}
+            }
+            tasks_specs.append(task_spec)
+
+        # ----- Behavior -----
+        behavior_id = 0
+        behavior_specs = {
+            'id': behavior_id,
+            'name': 'Behavior#%s' % behavior_id,
+            'tasks_specs': tasks_specs
+        }
+
+        return actions_names, behavior_specs, team_specs
+
+    # -------------------- #
+
     @staticmethod
     def calc_no_concurrency_worst_time(behavior_specs, team_specs):
         """
@@ -357,6 +529,13 @@ class Scenario:
         (2) the agent selected needs the maximum time possible in order to complete it
         (3) no concurrency happens
         """
+        agents_skills = [agent_specs['skills'] for agent_specs in team_specs['agents_specs']]
+        if isinstance(agents_skills[0], AgentSkills):
+            # skills of a SkillTable - worst times of all actions at once
+            return int(agents_skills[0].table.get_worst_times(
+                [action_id for task_specs in behavior_specs['tasks_specs']
+                 for action_id in task_specs['action_list']]).sum())
+
         worst_case_time = 0
         for task_specs in behavior_specs['tasks_specs']:
             for action_id in task_specs['action_list']:
@@ -365,3 +544,60 @@ class Scenario:
                 worst_case_time += max(action_times)
 
         return worst_case_time
+
+
+class ScenarioCache:
+
+    max_size = None         # num of scenarios kept in memory
+    library_path = None     # directory of serialized scenarios / None
+    scenarios = None        # {(scenario_type, scenario_id): Scenario} least recently used first
+
+    def __init__(self, max_size=8, library_path=None):
+        """
+        in-memory cache of generated scenarios, evicting the least recently used ones
+        if library_path is given, scenarios are also saved to / loaded from that directory
+        """
+        if not (isinstance(max_size, int) and max_size > 0):
+            raise ValueError('Invalid max_size: `%s`' % max_size)
+
+        self.max_size = max_size
+        self.library_path = library_path
+        self.scenarios = OrderedDict()
+
+    def get(self, scenario_type, scenario_id):
+        """
+        returns a fresh copy of the scenario, generating it only if not found in memory or in the library
+        """
+        key = (scenario_type, None if scenario_type in ['salad', 'cereal'] else scenario_id)
+
+        if key in self.scenarios:
+            self.scenarios.move_to_end(key)
+        else:
+            self.scenarios[key] = self.load(*key)
+            if len(self.scenarios) > self.max_size:
+                self.scenarios.popitem(last=False)
+
+        return self.scenarios[key].copy()
+
+    def load(self, scenario_type, scenario_id):
+        """
+        returns scenario from library, generating (and saving) it if needed
+        """
+        if self.library_path is None:
+            return Scenario(scenario_type, scenario_id)
+
+        scenario_path = os.path.join(self.library_path, '%s-%s.pickle' % (scenario_type, scenario_id))
+        if os.path.exists(scenario_path):
+            with open(scenario_path, 'rb') as f:
+                return pickle.load(f)
+
+        scenario = Scenario(scenario_type, scenario_id)
+
+        # write to a temporary file first, so that other processes never read a partially written scenario
+        os.makedirs(self.library_path, exist_ok=True)
+        temp_path = '%s.%s.tmp' % (scenario_path, os.getpid())
+        with open(temp_path, 'wb') as f:
+            pickle.dump(scenario, f)
+        os.replace(temp_path, scenario_path)
+
+        return scenario
@@ -0,0 +1,102 @@
+from helpers import calc_actions_tt_table, calc_actions_mr_table, calc_actions_me_table
+
+import numpy as np
+
+
+class ScoreTables:
+    """
+    static scores of every assignment of a task to an agent of a scenario (agents x tasks),
+    depending only on agents' skills and tasks' actions (not on the state of the simulation)
+    tables are built the first time a planner needs them, and shared by all planners & trials run on the scenario
+    """
+
+    agents_ids = None
+    tasks_ids = None
+    agents_index = None             # {agent_id: row}
+    tasks_index = None              # {task_id: column}
+
+    tt = None                       # FuzzyArray of total times
+    tt_defuzzified = None           # numpy array of defuzzified total times
+    mr = None                       # numpy array of min robustness levels
+    me = None                       # numpy array of max error levels
+
+    dpv1_costs = None               # list of lists of assignment costs (daisy_planner_v1)
+    team_benefit_scores = None      # {agent_id: {task_id: team benefit}} (daisy_planner_v2)
+    max_vanilla_scores = None       # {m: {task_id: max vanilla score}} (new_planner)
+
+    def __init__(self):
+        self.max_vanilla_scores = {}
+
+    def build(self, agents, tasks):
+        """
+        calculates the basic tables for the given agents & tasks, unless already built
+        returns self
+        """
+        if self.tt is not None:
+            return self
+
+        self.agents_ids = [agent.id for agent in agents]
+        self.tasks_ids = [task.id for task in tasks]
+        self.agents_index = {}
+        for agent_index, agent_id in enumerate(self.agents_ids):
+            self.agents_index.setdefault(agent_id, agent_index)
+        self.tasks_index = {task_id: task_index for task_index, task_id in enumerate(self.tasks_ids)}
+
+        self.tt = calc_actions_tt_table(agents, tasks)
+        self.tt_defuzzified = self.tt.defuzzify()
+        self.mr = calc_actions_mr_table(agents, tasks)
+        self.me = calc_actions_me_table(agents, tasks)
+
+        self.dpv1_costs = (self.tt_defuzzified / (1 + self.mr)).tolist()
+        return self
+
+    def get_team_benefit_scores(self):
+        """
+        team benefit of assigning each task to each agent (daisy_planner_v2)
+        returns {agent_id: {task_id: score}}
+        """
+        if self.team_benefit_scores is None:
+
+            # assignment costs (agents x tasks)
+            ac = self.tt * self.me
+
+            # team benefit scores
+            tb = {}
+
+            for agent_index, agent_id in enumerate(self.agents_ids):
+                if len(self.agents_ids) > 1:
+                    # differences of every other agent's assignment costs from this agent's ones
+                    ac_diffs = (ac - ac[agent_index]).defuzzify()
+                    ac_diffs[agent_index] = -np.inf
+                    agent_tb = ac_diffs.max(axis=0).tolist()
+                else:
+                    agent_tb = [1] * len(self.tasks_ids)
+                tb[agent_id] = {task_id: agent_tb[task_index] for task_index, task_id in enumerate(self.tasks_ids)}
+
+            self.team_benefit_scores = tb
+
+        return self.team_benefit_scores
+
+    def get_max_vanilla_scores(self, m):
+        """
+        maximum vanilla score each task can achieve if assigned to the most appropriate agent (new_planner)
+        returns {task_id: score}
+        """
+        if m not in self.max_vanilla_scores:
+            """
+            vanilla scores do not consider:
+            - constraints between tasks
+            - expected times for agent to be available for assignment
+            they exist so that a theoretical maximum value score for each task can be calculated
+            in order to normalize the actual scores later
+            """
+
+            # vanilla scores for each task theoretically assigned to each agent (tasks x agents)
+            # with python's float pow (numpy's vectorized one can differ in the last digit, changing assignments)
+            vanilla_scores = [[mr ** m / tt ** (1-m) for mr, tt in zip(agents_mr, agents_tt)]
+                              for agents_mr, agents_tt in zip(self.mr.T.tolist(), self.tt_defuzzified.T.tolist())]
+
+            self.max_vanilla_scores[m] = {task_id: max([0] + vanilla_scores[task_index])
+                                          for task_index, task_id in enumerate(self.tasks_ids)}
+
+        return self.max_vanilla_scores[m]
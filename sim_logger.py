@@ -9,11 +9,49 @@ class Logger:
     print_planner = None
     print_events = None
 
+    # methods printing each kind of info, replaced by no-ops when it is not printed
+    methods = {
+        'print_state_basic': ['state_header', 'state_row'],
+        'print_state_more': ['state_more_info'],
+        'print_planner': ['planner_dpv2_benefit_table', 'planner_new_vanilla_table', 'planner_new_values_table',
+                          'planner_search', 'planner_assignments'],
+        'print_events': ['behavior_completed', 'behavior_failed', 'task_completed', 'action_completed',
+                         'agent_assigned_task', 'agent_assigned_action', 'agent_started_working', 'agent_at_rest'],
+    }
+
     def __init__(self, verbose_level):
         self.print_state_basic = True if verbose_level in ['basic', 'full'] else False
         self.print_state_more = True if verbose_level in ['full'] else False
         self.print_planner = True if verbose_level in ['basic', 'full'] else False
         self.print_events = True if verbose_level in ['basic', 'full'] else False
+        self.disable_methods()
+
+    def disable_methods(self):
+        """
+        binds the methods of the kinds of info not printed to a no-op,
+        so calls to them from the simulation's hot paths cost no more than an empty call
+        (and the info they print, e.g. expected times of actions, is never calculated)
+        """
+        for flag, methods_names in self.methods.items():
+            if not getattr(self, flag):
+                for method_name in methods_names:
+                    setattr(self, method_name, self.ignore)
+
+    @staticmethod
+    def ignore(*args):
+        pass
+
+    def clock(self, sim_time):
+        """
+        called before every step of the simulation that can change its state (used by loggers recording events)
+        """
+        pass
+
+    def close(self):
+        """
+        called at the end of the simulation (used by loggers saving their log)
+        """
+        pass
 
     # ---------- States ---------- #
 
@@ -90,12 +128,16 @@ class Logger:
 
             # more info on tasks & actions
             import helpers
+            exp_times_memo = {}
             for task in behavior.tasks:
                 print()
                 print('    %s (%s)::  ' % (task.id, task.status), end='')
                 for action in task.actions:
-                    print('%s (%s) %s : %s | ' % (action.id, action.status, action.constraints,
-                                                  helpers.calc_exp_times_for_action(team, task.id, action.id)), end='')
+                    # constraints printed as in the specs ('task_id-action_id')
+                    constraints = ['%s-%s' % constraint for constraint in action.constraints]
+                    print('%s (%s) %s : %s | ' % (action.id, action.status, constraints,
+                                                  helpers.calc_exp_times_for_action(team, task.id, action.id,
+                                                                                    exp_times_memo)), end='')
 
     # ---------- Planner Thoughts ---------- #
 
@@ -119,6 +161,10 @@ class Logger:
                 for item in v.items():
                     print('%s: %.3f  ' % (item[0], item[1]), end='')
 
+    def planner_search(self, nodes_explored, latency):
+        if self.print_planner:
+            print('\nSearch: %s nodes explored in %.2f ms' % (nodes_explored, 1000 * latency), end='')
+
     def planner_assignments(self, assignments):
         if self.print_planner:
             print('\nAssignments: %s' % assignments)
@@ -129,6 +175,10 @@ class Logger:
         if self.print_events:
             print('Behavior %s completed' % behavior_id, end=' / ')
 
+    def behavior_failed(self, behavior_id):
+        if self.print_events:
+            print('Behavior %s failed' % behavior_id, end=' / ')
+
     # ---------- Task Events ---------- #
 
     def task_completed(self, task_id):
@@ -137,11 +187,11 @@ class Logger:
 
     # ---------- Action Events ---------- #
 
-    def action_available(self, action_id):
-        if self.print_events:
-            print('Action %s is now available' % action_id, end=' / ')
+    def action_available(self, task_id, action_id):
+        # constraints released are only recorded by the trace logger, the printed log is kept as it was
+        pass
 
-    def action_completed(self, action_id):
+    def action_completed(self, task_id, action_id):
         if self.print_events:
             print('Action %s completed' % action_id, end=' / ')
 
@@ -0,0 +1,163 @@
+from sim_logger import Logger
+from sim_trace import load_trace
+
+
+class ReplayBehavior:
+    """
+    state of behavior, tasks & actions as rebuilt from the records of a trace
+    provides the attributes used by Logger for printing states
+    """
+
+    def __init__(self, tasks_layout):
+        self.tasks = [ReplayTask(task_layout) for task_layout in tasks_layout]
+        self.tasks_index = {task.id: task for task in self.tasks}
+
+    def __getitem__(self, key):
+        return self.tasks_index[key]
+
+
+class ReplayTask:
+
+    def __init__(self, task_layout):
+        self.id = task_layout['id']
+        self.actions = [ReplayAction(action_id, constrained)
+                        for action_id, constrained in zip(task_layout['actions'], task_layout['constrained'])]
+        self.actions_index = {action.id: action for action in self.actions}
+
+    def __getitem__(self, key):
+        return self.actions_index[key]
+
+
+class ReplayAction:
+
+    def __init__(self, action_id, constrained):
+        self.id = action_id
+        self.status = None
+        # only whether the action is still constrained is traced
+        self.constraints = [True] if constrained else []
+
+
+class ReplayTeam:
+
+    def __init__(self, agents_ids):
+        self.agents = [ReplayAgent(agent_id) for agent_id in agents_ids]
+        self.agents_index = {agent.id: agent for agent in self.agents}
+
+    def __getitem__(self, key):
+        return self.agents_index[key]
+
+
+class ReplayAgent:
+
+    def __init__(self, agent_id):
+        self.id = agent_id
+        self.status = 'rest'
+        self.current_task = None
+        self.current_action = None
+
+
+def replay(trace_path):
+    """
+    prints the timeline of a traced simulation, as printed live by Logger with `basic` verbose level
+    """
+    header, records = load_trace(trace_path)
+    behavior = ReplayBehavior(header['tasks'])
+    team = ReplayTeam(header['agents'])
+    logger = Logger('basic')
+
+    # planner tables are traced as one record per entry - gathered before being printed
+    table_printers = {
+        'planner_dpv2_benefit': logger.planner_dpv2_benefit_table,
+        'planner_new_vanilla': logger.planner_new_vanilla_table,
+        'planner_new_value': logger.planner_new_values_table,
+        'planner_assignment': logger.planner_assignments,
+    }
+    table_event = None
+    table = None
+
+    logger.state_header(behavior, team)
+
+    for record in records:
+        event = record['event']
+
+        # ----- planner tables -----
+        if table_event is not None and event != table_event:
+            table_printers[table_event](table)
+            table_event = None
+        if event in table_printers:
+            if table_event is None:
+                table_event = event
+                table = {}
+            if event == 'planner_new_vanilla':
+                table[record['task_id']] = record['value']
+            elif event == 'planner_assignment':
+                table[record['agent_id']] = record.get('task_id')
+            else:
+                table.setdefault(record['agent_id'], {})[record['task_id']] = record['value']
+            continue
+
+        # ----- planner search -----
+        if event == 'planner_search':
+            logger.planner_search(record['action_id'], record['value'])
+
+        # ----- states -----
+        elif event == 'row':
+            logger.state_row(behavior, team, record['time'])
+
+        # ----- behavior / task / action events -----
+        elif event == 'behavior_completed':
+            logger.behavior_completed(header['behavior'])
+        elif event == 'behavior_failed':
+            logger.behavior_failed(header['behavior'])
+        elif event == 'task_completed':
+            logger.task_completed(record['task_id'])
+        elif event == 'action_available':
+            behavior[record['task_id']][record['action_id']].constraints = []
+            logger.action_available(record['task_id'], record['action_id'])
+        elif event == 'action_completed':
+            behavior[record['task_id']][record['action_id']].status = 'completed'
+            logger.action_completed(record['task_id'], record['action_id'])
+
+        # ----- agent events -----
+        elif event == 'agent_assigned_task':
+            agent = team[record['agent_id']]
+            agent.current_task = behavior[record['task_id']]
+            for action in agent.current_task.actions:
+                action.status = 'inqueue'
+            logger.agent_assigned_task(agent.id, agent.current_task.id)
+        elif event == 'agent_assigned_action':
+            agent = team[record['agent_id']]
+            agent.current_action = agent.current_task[record['action_id']]
+            agent.current_action.status = header['action_statuses'][int(record['value'])]
+            agent.status = 'wait'
+            logger.agent_assigned_action(agent.id, agent.current_task.id, agent.current_action.id,
+                                         agent.current_action.status)
+        elif event == 'agent_started_working':
+            agent = team[record['agent_id']]
+            agent.status = 'work'
+            agent.current_action.status = 'inprogress'
+            logger.agent_started_working(agent.id, agent.current_task.id, agent.current_action.id)
+        elif event == 'agent_at_rest':
+            agent = team[record['agent_id']]
+            agent.status = 'rest'
+            agent.current_task = None
+            agent.current_action = None
+            logger.agent_at_rest(agent.id)
+
+        else:
+            raise ValueError('Unknown trace event: `%s`' % event)
+
+    if table_event is not None:
+        table_printers[table_event](table)
+    print()
+
+
+if __name__ == '__main__':
+
+    # ----- prepare settings -----
+    replay_settings = {
+        'trace_path': 'reports/trace-1000.bin',     # trace of a simulation run with logger_verbose_level `trace`
+    }
+
+    # ----- replay simulation -----
+    replay(replay_settings['trace_path'])
@@ -1,6 +1,17 @@
 
+from array import array
 from os import path
-from csv import DictWriter
+from csv import DictReader, DictWriter
+from uuid import uuid4
+import numpy as np
+
+try:
+    # optional dependency, needed only for the parquet reports
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 
 class Reporter:
@@ -9,15 +20,29 @@ class Reporter:
     export_enabled = None
 
     experiment_id = None
+    export_handler = None   # callable receiving the trial's results row
+
     trial_report = {}
     actions_report = {}
-    agents_report = {}
+    agents_report = {}          # {agent_id: {status: num of steps}}
+    agents_timeline = None      # {agent_id: array of statuses codes per step} / None if timeline not kept
+    team_report = None          # numpy array (agents x statuses codes) of steps reported for all agents at once
+    concurrency_report = {}     # {True / False: num of steps in which all agents were / were not working}
+
+    # state of the current round of reports (every agent reports her status once per round)
+    round_agents = None         # num of agents reported
+    round_all_work = None       # if all agents reported so far are working
+    round_steps = None          # num of steps reported
+
+    statuses_codes = {'rest': 0, 'wait': 1, 'work': 2}
 
     def __init__(self, settings, init_data):
 
         # set reporter's settings
         self.print_enabled = True if settings['print_enabled'] is True else False
         self.export_enabled = True if settings['export_enabled'] is True else False
+        self.export_handler = settings.get('export_handler') or self.export_to_csv
+        timeline_enabled = True if settings.get('timeline_enabled') is True else False
 
         # set experiment params
         self.experiment_id = init_data['experiment_id']
@@ -40,11 +65,56 @@ class Reporter:
         # init agents' report
         self.agents_report = {}
         for agent_id in init_data['agents_ids']:
-            self.agents_report[agent_id] = []
+            self.agents_report[agent_id] = {'rest': 0, 'wait': 0, 'work': 0}
+        self.agents_timeline = {agent_id: array('b') for agent_id in init_data['agents_ids']} \
+            if timeline_enabled else None
 
-    def report_agent_status(self, agent_id, agent_status):
+        self.team_report = None
+
+        # init concurrency report
+        self.concurrency_report = {True: 0, False: 0}
+        self.round_agents = 0
+        self.round_all_work = True
+        self.round_steps = None
+
+    def report_agent_status(self, agent_id, agent_status, num_of_steps=1):
         if self.print_enabled or self.export_enabled:
-            self.agents_report[agent_id].append(agent_status)
+
+            agent_report = self.agents_report[agent_id]
+            if agent_status not in agent_report:
+                raise ValueError('Unknown agent status: `%s`' % agent_status)
+            agent_report[agent_status] += num_of_steps
+
+            if self.agents_timeline is not None:
+                self.agents_timeline[agent_id].extend(array('b', [self.statuses_codes[agent_status]]) * num_of_steps)
+
+            # steps are concurrent when all agents are working - known once every agent has reported
+            self.round_agents += 1
+            self.round_all_work = self.round_all_work and agent_status == 'work'
+            self.round_steps = num_of_steps if self.round_steps is None else min(self.round_steps, num_of_steps)
+            if self.round_agents == len(self.agents_report):
+                self.concurrency_report[self.round_all_work] += self.round_steps
+                self.round_agents = 0
+                self.round_all_work = True
+                self.round_steps = None
+
+    def report_team_status(self, agents_statuses_codes, num_of_steps=1):
+        """
+        same as report_agent_status for every agent (in the order of agents_ids), in one go
+        agents_statuses_codes :: numpy array of the status code of every agent (see statuses_codes)
+        """
+        if self.print_enabled or self.export_enabled:
+
+            if self.team_report is None:
+                self.team_report = np.zeros((len(self.agents_report), len(self.statuses_codes)), dtype=np.int64)
+            self.team_report[np.arange(len(self.agents_report)), agents_statuses_codes] += num_of_steps
+
+            if self.agents_timeline is not None:
+                for agent_id, status_code in zip(self.agents_report.keys(), agents_statuses_codes.tolist()):
+                    self.agents_timeline[agent_id].extend(array('b', [status_code]) * num_of_steps)
+
+            all_work = bool((agents_statuses_codes == self.statuses_codes['work']).all())
+            self.concurrency_report[all_work] += num_of_steps
 
     def report_action_robustness(self, task_id, action_id, robustness):
         if self.print_enabled or self.export_enabled:
@@ -72,14 +142,9 @@ class Reporter:
                 print('\n\nBasic info :: %s' % self.trial_report)
 
             # ----- concurrent work -----
-            timesteps = list(zip(*([status for status in self.agents_report.values()])))
-            concurrency = list(map(
-                lambda step: all([True if ag_step == 'work' else False for ag_step in step]),
-                timesteps))
-
             concurrency_stats = {
-                'concurrency_true': concurrency.count(True),
-                'concurrency_false': concurrency.count(False)
+                'concurrency_true': self.concurrency_report[True],
+                'concurrency_false': self.concurrency_report[False]
             }
 
             if self.print_enabled:
@@ -88,14 +153,7 @@ class Reporter:
             # ----- agents' stats -----
             agents_stats = {}
             for agent_id in self.agents_report.keys():
-                agent_stats = {
-                    'rest': self.agents_report[agent_id].count('rest'),
-                    'wait': self.agents_report[agent_id].count('wait'),
-                    'work': self.agents_report[agent_id].count('work'),
-                    'total': len(self.agents_report[agent_id])
-                }
-                if agent_stats['total'] != agent_stats['rest'] + agent_stats['wait'] + agent_stats['work']:
-                    raise ValueError('Unknown agents states')
+                agent_stats = self.get_agent_stats(agent_id)
 
                 for k, v in agent_stats.items():
                     agents_stats['ag_%s_%s' % (agent_id, k)] = v
@@ -103,24 +161,217 @@ class Reporter:
                 if self.print_enabled:
                     print('Agent#%s :: %s' % (agent_id, agent_stats))
 
-            # ----- save data to csv -----
+            # ----- save data -----
             if self.export_enabled:
+                data = {**self.trial_report, **concurrency_stats, **agents_stats}
+                self.export_handler(data)
 
-                # check if file exists
-                if self.experiment_id:
-                    csv_path = 'reports/experiment-%s-%s.csv' \
-                               % (self.experiment_id, self.scenario_type)
-                else:
-                    csv_path = 'reports/generic.csv'
-                file_preexists = True if path.exists(csv_path) else False
+    def get_agent_stats(self, agent_id):
+        """
+        returns {status: num of steps} of agent, including the total num of steps reported
+        """
+        agent_stats = dict(self.agents_report[agent_id])
+        if self.team_report is not None:
+            agent_index = list(self.agents_report.keys()).index(agent_id)
+            for status, status_code in self.statuses_codes.items():
+                agent_stats[status] += int(self.team_report[agent_index, status_code])
+        agent_stats['total'] = agent_stats['rest'] + agent_stats['wait'] + agent_stats['work']
+        return agent_stats
 
-                # gather data
-                data = {**self.trial_report, **concurrency_stats, **agents_stats}
-                fieldnames = data.keys()
-
-                # write data to file
-                with open(csv_path, 'a', newline='') as f:
-                    csv_writer = DictWriter(f, fieldnames=fieldnames)
-                    if not file_preexists:
-                        csv_writer.writeheader()
-                    csv_writer.writerow(data)
+    def get_agent_timeline(self, agent_id):
+        """
+        returns the list of statuses of agent per step (timeline must be enabled)
+        """
+        if self.agents_timeline is None:
+            raise ValueError('Agents timeline not kept by reporter')
+        statuses = {code: status for status, code in self.statuses_codes.items()}
+        return [statuses[code] for code in self.agents_timeline[agent_id]]
+
+    def export_to_csv(self, data):
+        """
+        default export handler - appends the trial's results row to the report csv
+        """
+        append_rows_to_csv(get_csv_path(self.experiment_id, self.scenario_type), [data])
+
+
+class ResultSink:
+
+    csv_path = None
+    flush_every = None      # num of rows kept in memory before they are written to file
+    rows = None
+
+    def __init__(self, csv_path, flush_every=1000):
+        """
+        experiment-scoped writer of trials' results rows
+        rows are buffered and appended to the csv file in batches, every flush_every rows and when closed
+        it is meant to be the single writer of a report, parallel workers should hand their rows over to it
+        """
+        if not (isinstance(flush_every, int) and flush_every > 0):
+            raise ValueError('Invalid flush_every: `%s`' % flush_every)
+
+        self.csv_path = csv_path
+        self.flush_every = flush_every
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # write rows of completed trials even if the experiment was interrupted
+        self.close()
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        append_rows_to_csv(self.csv_path, self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+
+class ParquetResultSink(ResultSink):
+
+    dataset_path = None
+    experiment_id = None
+
+    def __init__(self, dataset_path, experiment_id, flush_every=1000):
+        """
+        experiment-scoped writer of trials' results rows to a parquet dataset (see ResultSink)
+        rows are written with a typed schema, partitioned by experiment and planner,
+        so that analyses can load only the columns and planners they need
+        """
+        if pa is None:
+            raise ImportError('pyarrow is needed for writing parquet reports')
+
+        super().__init__(None, flush_every)
+        self.dataset_path = dataset_path
+        self.experiment_id = experiment_id
+
+    def flush(self):
+        if self.rows:
+            rows = [{'experiment_id': self.experiment_id, **row} for row in self.rows]
+            table = pa.Table.from_pylist(rows, schema=get_results_schema(rows[0].keys()))
+            pq.write_to_dataset(table, self.dataset_path, partition_cols=['experiment_id', 'planner'],
+                                basename_template='part-%s-{i}.parquet' % uuid4().hex)
+        self.rows = []
+
+
+class CompletionLedger:
+
+    completed = None    # set of (experiment_id, scenario_id, simulation_id, planner) of trials already reported
+
+    def __init__(self):
+        """
+        index of the trials whose results have already been saved, used for resuming experiments
+        """
+        self.completed = set()
+
+    def __contains__(self, key):
+        return key in self.completed
+
+    def __len__(self):
+        return len(self.completed)
+
+    def add(self, experiment_id, scenario_id, simulation_id, planner):
+        self.completed.add((experiment_id, scenario_id, simulation_id, planner))
+
+    def load_csv(self, csv_path, experiment_id):
+        """
+        add the trials reported in the csv file of an experiment
+        a row left incomplete by an interrupted write is removed from the file
+        """
+        if not path.exists(csv_path):
+            return
+
+        remove_partial_csv_row(csv_path)
+
+        def parse_id(value):
+            return int(value) if value else None
+
+        with open(csv_path, newline='') as f:
+            for row in DictReader(f):
+                if None not in row.values():
+                    self.add(experiment_id, parse_id(row['scenario_id']), parse_id(row['simulation_id']),
+                             row['planner'])
+
+    def load_parquet(self, dataset_path, experiment_id):
+        """
+        add the trials of an experiment reported in a parquet dataset
+        """
+        if not path.exists(dataset_path):
+            return
+        if pq is None:
+            raise ImportError('pyarrow is needed for reading parquet reports')
+
+        table = pq.ParquetDataset(dataset_path, filters=[('experiment_id', '=', experiment_id)]) \
+            .read(columns=['scenario_id', 'simulation_id', 'planner'])
+        for row in table.to_pylist():
+            self.add(experiment_id, row['scenario_id'], row['simulation_id'], str(row['planner']))
+
+
+def remove_partial_csv_row(csv_path):
+    """
+    truncate csv file after its last complete line
+    """
+    with open(csv_path, 'rb+') as f:
+        content = f.read()
+        if content and not content.endswith(b'\n'):
+            f.truncate(content.rfind(b'\n') + 1)
+
+
+def get_results_schema(fieldnames):
+    """
+    returns the arrow schema of results rows with the given fieldnames
+    agents' stats & concurrency stats are counts of time steps
+    """
+    fields_types = {
+        'experiment_id': pa.int64(),
+        'scenario_id': pa.int64(),
+        'time_max': pa.int64(),
+        'simulation_id': pa.int64(),
+        'planner': pa.string(),
+        'behavior_status': pa.string(),
+        'time_spent': pa.float64(),
+        'robustness': pa.float64(),
+    }
+    return pa.schema([(fieldname, fields_types.get(fieldname, pa.int64())) for fieldname in fieldnames])
+
+
+def get_parquet_path(scenario_type):
+    """
+    returns the path of the parquet dataset the results of experiments on a scenario type are saved in
+    (experiments on the same scenario type share the same columns)
+    """
+    return 'reports/results-%s.parquet' % scenario_type
+
+
+def get_csv_path(experiment_id, scenario_type):
+    """
+    returns the path of the csv file the results of an experiment are saved in
+    """
+    if experiment_id:
+        return 'reports/experiment-%s-%s.csv' % (experiment_id, scenario_type)
+    else:
+        return 'reports/generic.csv'
+
+
+def append_rows_to_csv(csv_path, rows):
+    """
+    appends rows (list of dicts) to csv file, writing the header if the file does not exist yet
+    """
+    if not rows:
+        return
+
+    # check if file exists
+    file_preexists = True if path.exists(csv_path) else False
+
+    # write data to file
+    with open(csv_path, 'a', newline='') as f:
+        csv_writer = DictWriter(f, fieldnames=rows[0].keys())
+        if not file_preexists:
+            csv_writer.writeheader()
+        csv_writer.writerows(rows)
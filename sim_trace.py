@@ -0,0 +1,188 @@
+from sim_logger import Logger
+
+import json
+import struct
+
+
+class TraceLogger(Logger):
+    """
+    logger recording the events of the simulation as fixed-width records in a memory buffer,
+    instead of printing them, and dumping them to a binary / jsonl trace file at the end of the simulation
+    the trace can be rendered offline by sim_replay.py
+    """
+
+    # record :: event, time, agent_id, task_id, action_id, value
+    record_struct = struct.Struct('<Bdiiid')
+    events = ['row', 'agent_assigned_task', 'agent_assigned_action', 'agent_started_working', 'agent_at_rest',
+              'action_available', 'action_completed', 'task_completed', 'behavior_completed',
+              'planner_dpv2_benefit', 'planner_new_vanilla', 'planner_new_value', 'planner_assignment',
+              'planner_search', 'behavior_failed']
+    action_statuses = [None, 'inqueue', 'inwaiting', 'inprogress', 'completed']
+
+    trace_path = None
+    trace_format = None     # binary / jsonl
+    header = None           # dict of team & behavior layout (written before the records)
+    buffer = None           # bytearray of records
+    time = None             # time of the current simulation step
+
+    def __init__(self, trace_path):
+        self.print_state_basic = False
+        self.print_state_more = False
+        self.print_planner = False
+        self.print_events = False
+
+        self.trace_path = trace_path
+        self.trace_format = 'jsonl' if trace_path.endswith('.jsonl') else 'binary'
+        self.buffer = bytearray()
+        self.time = 0.0
+
+        # fields not relevant to an event are recorded as -1 (ids) / nan (value)
+        self.event_codes = {event: code for code, event in enumerate(self.events)}
+        self.status_codes = {status: code for code, status in enumerate(self.action_statuses)}
+
+    def record(self, event, agent_id=-1, task_id=-1, action_id=-1, value=float('nan')):
+        self.buffer += self.record_struct.pack(self.event_codes[event], self.time, agent_id,
+                                               -1 if task_id is None else task_id, action_id, value)
+
+    def clock(self, sim_time):
+        self.time = sim_time
+
+    def close(self):
+        """
+        dumps the trace to its file
+        """
+        if self.trace_format == 'binary':
+            header = json.dumps(self.header).encode()
+            with open(self.trace_path, 'wb') as trace_file:
+                trace_file.write(struct.pack('<I', len(header)))
+                trace_file.write(header)
+                trace_file.write(self.buffer)
+        else:
+            with open(self.trace_path, 'w') as trace_file:
+                trace_file.write(json.dumps(self.header) + '\n')
+                for record in self.get_records():
+                    trace_file.write(json.dumps(record) + '\n')
+
+    def get_records(self):
+        """
+        yields the records of the trace as dicts
+        """
+        for code, time, agent_id, task_id, action_id, value in self.record_struct.iter_unpack(self.buffer):
+            yield record_to_dict(self.events[code], time, agent_id, task_id, action_id, value)
+
+    # ---------- States ---------- #
+
+    def state_header(self, behavior, team):
+        self.header = {
+            'record_format': self.record_struct.format,
+            'behavior': behavior.id,
+            'events': self.events,
+            'action_statuses': self.action_statuses,
+            'agents': [agent.id for agent in team.agents],
+            'tasks': [{'id': task.id,
+                       'actions': [action.id for action in task.actions],
+                       'constrained': [bool(action.constraints) for action in task.actions]}
+                      for task in behavior.tasks],
+        }
+
+    def state_row(self, behavior, team, sim_time):
+        self.time = sim_time
+        self.record('row')
+
+    def state_more_info(self, behavior, team):
+        pass
+
+    # ---------- Planner Thoughts ---------- #
+
+    def planner_dpv2_benefit_table(self, benefit_scores):
+        for agent_id, tasks_scores in benefit_scores.items():
+            for task_id, score in tasks_scores.items():
+                self.record('planner_dpv2_benefit', agent_id=agent_id, task_id=task_id, value=score)
+
+    def planner_new_vanilla_table(self, vanilla_scores):
+        for task_id, score in vanilla_scores.items():
+            self.record('planner_new_vanilla', task_id=task_id, value=score)
+
+    def planner_new_values_table(self, values):
+        for agent_id, tasks_values in values.items():
+            for task_id, value in tasks_values.items():
+                self.record('planner_new_value', agent_id=agent_id, task_id=task_id, value=value)
+
+    def planner_search(self, nodes_explored, latency):
+        # num of nodes is kept in the (integer) action_id field
+        self.record('planner_search', action_id=nodes_explored, value=latency)
+
+    def planner_assignments(self, assignments):
+        for agent_id, task_id in assignments.items():
+            self.record('planner_assignment', agent_id=agent_id, task_id=task_id)
+
+    # ---------- Behavior Events ---------- #
+
+    def behavior_completed(self, behavior_id):
+        self.record('behavior_completed')
+
+    def behavior_failed(self, behavior_id):
+        self.record('behavior_failed')
+
+    # ---------- Task Events ---------- #
+
+    def task_completed(self, task_id):
+        self.record('task_completed', task_id=task_id)
+
+    # ---------- Action Events ---------- #
+
+    def action_available(self, task_id, action_id):
+        self.record('action_available', task_id=task_id, action_id=action_id)
+
+    def action_completed(self, task_id, action_id):
+        self.record('action_completed', task_id=task_id, action_id=action_id)
+
+    # ---------- Agent Events ---------- #
+
+    def agent_assigned_task(self, agent_id, task_id):
+        self.record('agent_assigned_task', agent_id=agent_id, task_id=task_id)
+
+    def agent_assigned_action(self, agent_id, task_id, action_id, action_status):
+        self.record('agent_assigned_action', agent_id=agent_id, task_id=task_id, action_id=action_id,
+                    value=self.status_codes[action_status])
+
+    def agent_started_working(self, agent_id, task_id, action_id):
+        self.record('agent_started_working', agent_id=agent_id, task_id=task_id, action_id=action_id)
+
+    def agent_at_rest(self, agent_id):
+        self.record('agent_at_rest', agent_id=agent_id)
+
+
+def record_to_dict(event, time, agent_id, task_id, action_id, value):
+    """
+    returns a record as a dict, keeping only the fields relevant to its event
+    """
+    record = {'event': event, 'time': time}
+    if agent_id != -1:
+        record['agent_id'] = agent_id
+    if task_id != -1:
+        record['task_id'] = task_id
+    if action_id != -1:
+        record['action_id'] = action_id
+    if value == value:     # not nan
+        record['value'] = value
+    return record
+
+
+def load_trace(trace_path):
+    """
+    returns the header and the list of records (as dicts) of a binary / jsonl trace file
+    """
+    if trace_path.endswith('.jsonl'):
+        with open(trace_path) as trace_file:
+            header = json.loads(trace_file.readline())
+            records = [json.loads(line) for line in trace_file]
+    else:
+        with open(trace_path, 'rb') as trace_file:
+            header_size, = struct.unpack('<I', trace_file.read(4))
+            header = json.loads(trace_file.read(header_size))
+            buffer = trace_file.read()
+        records = [record_to_dict(header['events'][code], time, agent_id, task_id, action_id, value)
+                   for code, time, agent_id, task_id, action_id, value
+                   in struct.iter_unpack(header['record_format'], buffer)]
+    return header, records
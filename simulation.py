@@ -1,9 +1,13 @@
 
 from scenario import Scenario
 from model import Behavior, Team
+from array_model import ArrayBehavior, ArrayTeam
 from sim_logger import Logger
+from sim_trace import TraceLogger
 from sim_reporter import Reporter
+from fuzzy_logic import TrapezoidalSampler
 
+from math import ceil
 import random
 
 
@@ -16,34 +20,96 @@ class Simulation:
     time = None
     time_step = None
     time_max = None
+    agents_ids = None
+    engine = None           # tick / event
+    model = None            # object / array
+    duration_model = None   # uniform / trapezoidal
 
     behavior = None
     team = None
+    sampler = None          # TrapezoidalSampler / None
 
     logger = None
     reporter = None
 
     def __init__(self, settings):
 
+        # ----- create scenario -----
+        if settings.get('scenario_cache') is not None:
+            scenario = settings['scenario_cache'].get(settings['scenario_type'], settings['scenario_id'])
+        else:
+            scenario = Scenario(settings['scenario_type'], settings['scenario_id'])
+        self.scenario_type = scenario.scenario_type
+        self.scenario_id = scenario.scenario_id
+        self.time_max = scenario.time_max
+        self.agents_ids = [agent_specs['id'] for agent_specs in scenario.team_specs['agents_specs']]
+
+        # ----- init simulator / logger / reporter -----
+        self.init_trial(settings)
+
+        # ----- init behavior & team -----
+        self.model = settings.get('model', 'object')
+        if self.model == 'object':
+            self.behavior = Behavior(scenario.behavior_specs, scenario.actions_names, self.logger)
+            self.team = Team(scenario.team_specs, settings['planner'], self.logger, self.reporter, self.sampler)
+        elif self.model == 'array':
+            self.behavior = ArrayBehavior(scenario.behavior_specs, scenario.actions_names, self.logger)
+            self.team = ArrayTeam(scenario.team_specs, settings['planner'], self.logger, self.reporter, self.sampler)
+        else:
+            raise ValueError('Unknown model: `%s`' % self.model)
+        self.team.score_tables = scenario.score_tables
+
+    def reset(self, settings):
+        """
+        prepare simulation for a new trial on the same scenario (e.g. different simulation_id / planner)
+        behavior & team are restored to their initial state in place instead of being rebuilt
+        """
+        if settings['scenario_type'] != self.scenario_type or \
+                (settings['scenario_id'] != self.scenario_id and self.scenario_id is not None):
+            raise ValueError('Cannot reset simulation of scenario %s-%s for scenario %s-%s'
+                             % (self.scenario_type, self.scenario_id,
+                                settings['scenario_type'], settings['scenario_id']))
+
+        # ----- init simulator / logger / reporter -----
+        self.init_trial(settings)
+
+        # ----- reset behavior & team -----
+        self.behavior.reset(self.logger)
+        self.team.reset(settings['planner'], self.logger, self.reporter, self.sampler)
+
+    def init_trial(self, settings):
+
         # ----- init simulator -----
         self.simulation_id = settings['simulation_id'] if settings['simulation_id'] else random.randint(1000, 9999)
         self.time = 0.0
         self.time_step = 1.0
+        self.engine = settings.get('engine', 'tick')
         random.seed(self.simulation_id)
 
-        # ----- create scenario -----
-        scenario = Scenario(settings['scenario_type'], settings['scenario_id'])
-        self.scenario_type = scenario.scenario_type
-        self.scenario_id = scenario.scenario_id
-        self.time_max = scenario.time_max
+        if self.engine not in ['tick', 'event']:
+            raise ValueError('Unknown engine: `%s`' % self.engine)
+
+        # ----- init actions' durations sampling -----
+        self.duration_model = settings.get('duration_model', 'uniform')
+        if self.duration_model == 'uniform':
+            self.sampler = None
+        elif self.duration_model == 'trapezoidal':
+            self.sampler = TrapezoidalSampler(self.simulation_id)
+        else:
+            raise ValueError('Unknown duration_model: `%s`' % self.duration_model)
 
         # ----- init logger -----
-        self.logger = Logger(settings['logger_verbose_level'])
+        if settings['logger_verbose_level'] == 'trace':
+            self.logger = TraceLogger(settings.get('trace_path') or 'reports/trace-%s.bin' % self.simulation_id)
+        else:
+            self.logger = Logger(settings['logger_verbose_level'])
 
         # ----- init reporter -----
         reporter_settings = {
             'print_enabled': settings['reporter_print'],
-            'export_enabled': settings['reporter_export']
+            'export_enabled': settings['reporter_export'],
+            'export_handler': settings.get('reporter_export_handler'),
+            'timeline_enabled': settings.get('reporter_timeline', False),
         }
         reporter_init_data = {
             'experiment_id': settings['experiment_id'],
@@ -52,14 +118,10 @@ class Simulation:
             'time_max': self.time_max,
             'simulation_id': self.simulation_id,
             'planner': settings['planner'],
-            'agents_ids': [agent_specs['id'] for agent_specs in scenario.team_specs['agents_specs']],
+            'agents_ids': self.agents_ids,
         }
         self.reporter = Reporter(reporter_settings, reporter_init_data)
 
-        # ----- init behavior & team -----
-        self.behavior = Behavior(scenario.behavior_specs, scenario.actions_names, self.logger)
-        self.team = Team(scenario.team_specs, settings['planner'], self.logger, self.reporter)
-
     def __call__(self):
 
         # ----- assign behavior to team -----
@@ -71,7 +133,20 @@ class Simulation:
 
         while self.behavior.status == 'inprogress' and self.time < self.time_max:
 
+            # ----- jump over steps in which nothing changes (event engine) -----
+            if self.engine == 'event':
+                steps_left = ceil((self.time_max - self.time) / self.time_step)
+                steps_to_skip = self.team.get_steps_to_next_event(self.time_step)
+                if steps_to_skip is None or steps_to_skip > steps_left:
+                    steps_to_skip = steps_left
+                if steps_to_skip:
+                    self.team.skip(self.time_step, steps_to_skip)
+                    self.time = round(self.time + self.time_step * steps_to_skip, 1)
+                    # only the clock changed, no new state to print
+                    continue
+
             # ----- make progress -----
+            self.logger.clock(self.time)
             self.team.progress(self.time_step)
 
             # ----- update clock -----
@@ -81,25 +156,40 @@ class Simulation:
             self.logger.state_more_info(self.behavior, self.team)
             self.logger.state_row(self.behavior, self.team, self.time)
 
+        # ----- a blocked trial is reported as run until the time limit (statuses no longer change) -----
+        if self.behavior.status == 'failed':
+            steps_left = ceil((self.time_max - self.time) / self.time_step)
+            if steps_left > 0:
+                self.team.skip(self.time_step, steps_left)
+                self.time = round(self.time + self.time_step * steps_left, 1)
+
         # ----- report job's outcome -----
         self.reporter.report_end_of_trial(self.behavior.status, self.time)
 
         # ----- print report -----
         self.reporter.present_results()
 
+        # ----- save log -----
+        self.logger.close()
+
 
 if __name__ == '__main__':
 
     # ----- prepare settings -----
     simulation_settings = {
         'experiment_id': None,
-        'scenario_type': 'custom_3_10',         # salad / cereal / custom_2_7 (agents, tasks)
+        'scenario_type': 'custom_3_10',         # salad / cereal / custom_2_7 / large_1000_10000 (agents, tasks)
         'scenario_id': 1000,
         'simulation_id': 1000,
-        'planner': 'new-0.5',                   # base / base+ / dpv1 / dpv2 / new-0.0 / new-0.5 / new-1.0
-        'logger_verbose_level': 'basic',        # False / basic / full
+        'planner': 'new-0.5',                   # base / base+ / dpv1 / dpv2 / new-0.0 / new-0.5 / new-1.0 / new+-0.5 / beam-4 / mcts-50
+        'engine': 'tick',                       # tick (fixed time steps) / event (jump to next event)
+        'duration_model': 'uniform',            # uniform / trapezoidal (distribution of actions' times)
+        'model': 'object',                      # object / array (numpy arrays, faster for large scenarios with base / base+ / dpv1 / dpv2 only)
+        'logger_verbose_level': 'basic',        # False / basic / full / trace (recorded to trace_path)
+        'trace_path': None,                     # trace file (.bin / .jsonl), reports/trace-<simulation_id>.bin if None
         'reporter_print': True,
         'reporter_export': True,
+        'reporter_timeline': False,             # keep each agent's status per step (memory grows with time)
     }
 
     # ----- run simulation -----
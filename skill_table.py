@@ -0,0 +1,75 @@
+import fuzzy_logic as fl
+
+import numpy as np
+
+
+class SkillTable:
+    """
+    skills of all agents of a team for all actions, kept in numpy arrays (agents x actions)
+    instead of a dict per agent & action, for scenarios too large to hold them as python objects
+    agents get their skills as AgentSkills (a view of a row of the table), accepted by Agent as they are
+    """
+
+    actions_ids = None      # numpy array of actions' ids (in the order of the table's columns)
+    actions_index = None    # {action_id: column}
+    times = None            # numpy array (agents x actions x 2) of (min, max) times
+    robustness = None       # numpy array (agents x actions) of robustness levels
+
+    def __init__(self, actions_ids, times, robustness):
+        self.actions_ids = actions_ids
+        self.actions_index = {action_id: column for column, action_id in enumerate(actions_ids.tolist())}
+        self.times = times
+        self.robustness = robustness
+
+    def get_agent_skills(self, agent_index):
+        return AgentSkills(self, agent_index)
+
+    def get_worst_times(self, actions_ids):
+        """
+        returns numpy array of the maximum time any agent could need for each of the actions
+        """
+        worst_times = self.times[:, :, 1].max(axis=0)
+        return worst_times[[self.actions_index[action_id] for action_id in actions_ids]]
+
+
+class AgentSkills:
+    """
+    skills of an agent of a SkillTable, with the interface of the skills dict of Agent
+    {action_id: {'t': Fuzzy, 'r': robustness, 'e': error}}
+    the skills of an action are created the first time they are needed, and kept (so fuzzy times keep their identity)
+    """
+
+    table = None
+    agent_index = None
+    skills = None           # {action_id: skill stats} of actions already needed
+
+    def __init__(self, table, agent_index):
+        self.table = table
+        self.agent_index = agent_index
+        self.skills = {}
+
+    def __getitem__(self, action_id):
+        skill_stats = self.skills.get(action_id)
+        if skill_stats is None:
+            column = self.table.actions_index[action_id]
+            duration_min, duration_max = self.table.times[self.agent_index, column].tolist()
+            robustness = self.table.robustness.item(self.agent_index, column)
+            skill_stats = {'t': fl.Fuzzy((duration_min, duration_max)), 'r': robustness, 'e': 10 - robustness}
+            self.skills[action_id] = skill_stats
+        return skill_stats
+
+    def __contains__(self, action_id):
+        return action_id in self.table.actions_index
+
+    def __len__(self):
+        return len(self.table.actions_index)
+
+    def __iter__(self):
+        return iter(self.table.actions_index)
+
+    def keys(self):
+        return self.table.actions_index.keys()
+
+    def items(self):
+        for action_id in self.table.actions_index:
+            yield action_id, self[action_id]